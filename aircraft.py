@@ -0,0 +1,650 @@
+import os
+import json
+from collections import namedtuple
+from functools import lru_cache
+from math import cos, sin, exp, radians, sqrt, asin, degrees, copysign
+
+#=========================================================================================================
+# Natural constants
+speed_sound = 340.3 # m/s
+gravitation = 9.81 # m/s^2
+air_density_sea_level = 1.225 # kg/m^3
+air_rarefaction_scale = 9.33e-5 # 1/m
+
+# Directory containing the aircraft profiles
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+DEFAULT_PROFILE = 'a320-232'
+
+# Technical specifications required in every aircraft profile
+PROFILE_SPECIFICATIONS = (
+    'name',
+    'height',                           # m
+    'length',                           # m
+    'front_surface',                    # m^2
+    'wings_surface',                    # m^2
+    'engines',
+    'engine_thrust',                    # N
+    'max_match',                        # match
+    'critic_match',                     # match
+    'friction_coefficient',
+    'critical_crash_energy',            # J
+    'tail_strike_pitch',                # deg
+    'mass_aircraft',                    # kg
+    'mass_fuel',                        # kg
+    'thrust_specific_fuel_consumption', # kg/(N*s)
+    'braking_deceleration',             # m/s^2
+)
+
+# Optional aerodynamic specifications, defaulting to the flapped airfoil fits used by the simulator
+# (third order polynomials of the flap deflection angle, see Aircraft.drag_coefficient and Aircraft.lift_coefficient)
+PROFILE_DEFAULTS = {
+    'drag_flap_polynomial': (7.867, -0.377, 0.046, -6.88e-04),
+    'lift_flap_polynomial': (3.702, 0.159, -3.17e-3, 2.15e-05),
+}
+
+# Step-invariant quantities derived from the specifications when compiling a profile
+PROFILE_DERIVED = (
+    'max_speed',                # m/s
+    'max_thrust',               # N
+    'max_fuel_flow',            # kg/s
+    'drag_divergence_match',    # match
+    'match_drag_factor',
+    'lift_divergence_offset',
+    'drag_flap_coefficients',
+    'lift_flap_coefficients',
+)
+
+AircraftProfile = namedtuple('AircraftProfile', PROFILE_SPECIFICATIONS + tuple(PROFILE_DEFAULTS) + PROFILE_DERIVED)
+AircraftProfile.__doc__ = """Immutable record of the technical specifications of an aircraft type.
+
+Besides the specifications read from the profile file, the record holds all quantities that
+do not change during a flight (maximal thrust, Match-drag factor, scaled flap polynomials, ...)
+so that they are not recomputed at every simulation step.
+"""
+
+#=========================================================================================================
+def compile_profile(specifications):
+    """Validate the specifications of an aircraft type and compile them into an immutable profile.
+
+    Args:
+        specifications (dict): Technical specifications of the aircraft
+
+    Returns:
+        AircraftProfile: Compiled aircraft profile
+
+    Raises:
+        ValueError: If a specification is missing, unknown or outside of its physical range
+    """
+    specifications = {**PROFILE_DEFAULTS, **specifications}
+    missing = [key for key in PROFILE_SPECIFICATIONS if key not in specifications]
+    if missing:
+        raise ValueError(f'Missing aircraft specifications: {", ".join(missing)}')
+    unknown = [key for key in specifications if key not in PROFILE_SPECIFICATIONS and key not in PROFILE_DEFAULTS]
+    if unknown:
+        raise ValueError(f'Unknown aircraft specifications: {", ".join(unknown)}')
+
+    for key in PROFILE_SPECIFICATIONS[1:]:
+        value = specifications[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f'Aircraft specification "{key}" must be a number, got {value!r}')
+        if key == 'friction_coefficient':
+            if value < 0:
+                raise ValueError(f'Aircraft specification "{key}" must not be negative, got {value!r}')
+        elif value <= 0:
+            raise ValueError(f'Aircraft specification "{key}" must be positive, got {value!r}')
+    if specifications['engines'] != int(specifications['engines']):
+        raise ValueError(f'The number of engines must be a whole number, got {specifications["engines"]!r}')
+    if not 0 < specifications['critic_match'] < 1:
+        raise ValueError(f'The critical match number must be between 0 and 1, got {specifications["critic_match"]!r}')
+    if specifications['max_match'] <= specifications['critic_match']:
+        raise ValueError('The maximal match number must exceed the critical match number')
+    for key in PROFILE_DEFAULTS:
+        specifications[key] = tuple(float(x) for x in specifications[key])
+        if len(specifications[key]) != 4:
+            raise ValueError(f'Aircraft specification "{key}" must contain four polynomial coefficients')
+
+    critic_match = specifications['critic_match']
+    drag_divergence_match = critic_match + (1 - critic_match)/4
+    max_thrust = specifications['engines']*specifications['engine_thrust']
+    # Scale the airfoil polynomials to the aircraft's drag and lift coefficients
+    drag_flap_coefficients = tuple(0.012*x for x in specifications['drag_flap_polynomial'])
+    lift_flap_coefficients = tuple(0.317*x for x in specifications['lift_flap_polynomial'])
+    lift_flap_coefficients = (lift_flap_coefficients[0] - 0.2,) + lift_flap_coefficients[1:]
+
+    return AircraftProfile(
+        max_speed = specifications['max_match']*speed_sound,
+        max_thrust = max_thrust,
+        max_fuel_flow = specifications['thrust_specific_fuel_consumption']*max_thrust,
+        drag_divergence_match = drag_divergence_match,
+        match_drag_factor = 1/sqrt(1 - critic_match**2),
+        lift_divergence_offset = 0.1*(drag_divergence_match - critic_match),
+        drag_flap_coefficients = drag_flap_coefficients,
+        lift_flap_coefficients = lift_flap_coefficients,
+        **specifications,
+    )
+#=========================================================================================================
+
+#=========================================================================================================
+def available_profiles():
+    """Names of the aircraft profiles shipped with the simulator.
+
+    Returns:
+        list: Profile names
+    """
+    return sorted(os.path.splitext(file)[0] for file in os.listdir(PROFILES_DIR) if file.endswith('.json'))
+#=========================================================================================================
+
+#=========================================================================================================
+@lru_cache(maxsize=None)
+def load_profile(profile=DEFAULT_PROFILE):
+    """Load and compile an aircraft profile.
+
+    Profiles are loaded and validated only once, subsequent calls return the same compiled record.
+
+    Args:
+        profile (str): Name of a profile in the profiles directory or path to a JSON profile file
+
+    Returns:
+        AircraftProfile: Compiled aircraft profile
+    """
+    path = profile if os.path.isfile(profile) else os.path.join(PROFILES_DIR, f'{profile}.json')
+    if not os.path.isfile(path):
+        raise ValueError(f'Unknown aircraft profile "{profile}". Available profiles: {", ".join(available_profiles())}')
+    with open(path) as file:
+        return compile_profile(json.load(file))
+#=========================================================================================================
+
+
+class Aircraft(object):
+    """
+    Flight physics of an aircraft, independent of any rendering.
+
+    Attributes:
+        profile : AircraftProfile
+            Technical specifications of the aircraft type.
+        vertical_speed : float
+            Vertical speed of the aircraft in m/s.
+        horizontal_speed : float
+            Horizontal speed of the aircraft in m/s.
+        altitude : float
+            Altitude of the aircraft above sea level in m.
+        position : float
+            Position of the aircraft in m.
+        slope : float
+            Slope of the aircraft in deg.
+        angle_of_attack : float
+            Angle of attack of the aircraft in deg.
+        pitch : float
+            Pitch of the aircraft in deg.
+        thrust_level : float
+            Thrust level of the aircraft.
+        gear_down : bool
+            Indicates whether the gear of the aircraft is down.
+        flap_deflection : float
+            Flap deflection angle of the aircraft in deg.
+        spoilers : bool
+            Indicates whether the spoilers are deployed.
+        brakes : bool
+            Indicates whether the wheel brakes are engaged.
+        mass_fuel : float
+            Mass of the aircraft's fuel in kg.
+        crashed :bool
+            Indicates whether the aircraft has crashed.
+        wind : WindField or None
+            Wind field the aircraft flies through, calm air if None.
+        time : float
+            Elapsed flight time of the aircraft in s.
+        wind_horizontal : float
+            Horizontal wind component at the aircraft in m/s.
+        wind_vertical : float
+            Vertical wind component at the aircraft in m/s.
+        terrain : Terrain or None
+            Terrain the aircraft flies over, flat ground at sea level if None.
+        ground : float
+            Elevation of the ground under the aircraft in m, updated at every step. The aircraft is on
+            the ground when its altitude equals this elevation.
+    """
+    # The wind is sampled at this interval instead of every step, the wind field varying over hundreds of meters
+    wind_interval = 0.25 # s
+
+    def __init__(self, profile=DEFAULT_PROFILE):
+        if isinstance(profile, str):
+            profile = load_profile(profile)
+        self.profile = profile
+
+        # Aircraft positioning parameters
+        self.vertical_speed = 0 # m/s
+        self.horizontal_speed = 0 # m/s
+        self.altitude = 0 # m
+        self.position = 0 # m
+        self.slope = 0 # deg
+        self.angle_of_attack = 0 # deg
+
+        # Aircraft control properties
+        self.pitch = 0 # deg
+        self.thrust_level = 0
+        self.gear_down = True
+        self.flap_deflection = 0  # deg
+        self.spoilers = False
+        self.brakes = False
+
+        # Aircraft loading
+        self.mass_fuel = profile.mass_fuel #kg
+        self.crashed = False
+
+        # Surrounding air
+        self.wind = None
+        self.time = 0 # s
+        self.wind_horizontal = 0 # m/s
+        self.wind_vertical = 0 # m/s
+        self._wind_clock = 0 # s
+
+        # Ground under the aircraft
+        self.terrain = None
+        self.ground = 0 # m
+        self._ground_slope = 0
+
+        # Flap-dependent coefficients, only recomputed when the flaps move
+        self._flap_cache = (None, None, None)
+
+    #------------------------------------------------------------
+    def mass(self):
+        """Total mass of the aircraft
+
+        Returns:
+            float: Mass in kg
+        """
+        return self.profile.mass_aircraft+self.mass_fuel
+    #------------------------------------------------------------
+    def air_rarefaction_factor(self):
+        """Approximate air density reduction factor due to altitude
+
+        Returns:
+            float: Air rarefaction factor
+        """
+        return exp(-air_rarefaction_scale*self.altitude)
+    #------------------------------------------------------------
+    def air_density(self):
+        """Air density around the aircraft's altitude
+
+        Returns:
+            float: Air density in kg/m^3
+        """
+        return air_density_sea_level*self.air_rarefaction_factor()
+    #------------------------------------------------------------
+    def match(self,speed):
+        """Convert speed in m/s to Match level.
+
+        Args:
+            speed (float): Speed in m/s
+
+        Returns:
+            float: Speed in Match
+        """
+        return speed/speed_sound
+    #------------------------------------------------------------
+    def collinear_speed(self):
+        """Speed collinear with the aircraft's direction
+
+        Returns:
+            float: Collinear speed in m/s
+        """
+        return sqrt(self.horizontal_speed**2 + self.vertical_speed**2)
+    #------------------------------------------------------------
+    def airspeed(self):
+        """Speed of the aircraft relative to the surrounding air
+
+        Returns:
+            float: Airspeed in m/s
+        """
+        return sqrt((self.horizontal_speed - self.wind_horizontal)**2 + (self.vertical_speed - self.wind_vertical)**2)
+    #------------------------------------------------------------
+    def flap_coefficients(self):
+        """Minimal drag and maximal lift coefficients for the current flap deflection.
+
+        Both are third order polynomials of the flap deflection angle, evaluated only when the flaps move.
+
+        Returns:
+            tuple: Minimal drag coefficient and maximal lift coefficient
+        """
+        flap_deflection, Cdrag_min, Clift_max = self._flap_cache
+        if flap_deflection != self.flap_deflection:
+            flap_deflection = self.flap_deflection
+            d0, d1, d2, d3 = self.profile.drag_flap_coefficients
+            l0, l1, l2, l3 = self.profile.lift_flap_coefficients
+            Cdrag_min = d0 + flap_deflection*(d1 + flap_deflection*(d2 + flap_deflection*d3))
+            Clift_max = l0 + flap_deflection*(l1 + flap_deflection*(l2 + flap_deflection*l3))
+            self._flap_cache = (flap_deflection, Cdrag_min, Clift_max)
+        return Cdrag_min, Clift_max
+    #------------------------------------------------------------
+    def drag_coefficient(self):
+        """
+        Drag coefficient of the aircraft.
+
+        The function accounts for the effects of approaching the speed of sound on the drag coefficient.
+        The minimal drag coefficient is approximated approximated as a third order polynomial function
+        of the flap deflection angle based on Fig.12 of Ref.1.
+
+        Returns:
+            float: Drag coefficient
+
+        References:
+            [1] Hussein et al., "Aerodynamic study of slotted flap for NACA 24012 airfoil by dynamic mesh techniques and visualization flow"
+             Journal of Thermal Engineering 2021, 7(2), 230-239
+        """
+        return self._drag_coefficient(self.airspeed())
+
+    def _drag_coefficient(self, collinear_speed):
+        # Minimal drag coefficient
+        # (approximated as third order polynomial function of the flap deflection angle based on Fig.12 of DOI:10.18186/thermal.871989)
+        Cdrag_min = self.flap_coefficients()[0]
+        # Compute drag coefficient at different angles of attack
+        Cdrag = Cdrag_min + (0.02*self.angle_of_attack)**2 # N
+        # Account for turbulence when approaching Match speeds
+        match_speed = collinear_speed/speed_sound
+        if match_speed < self.profile.critic_match:
+            return Cdrag/sqrt(1 - (match_speed**2))
+        else:
+            return Cdrag*(15*(match_speed - self.profile.critic_match) + self.profile.match_drag_factor)
+    #------------------------------------------------------------
+    def lift_coefficient(self):
+        """
+        Lift coefficient of the aircraft.
+
+        The function accounts for the effects of approaching the speed of sound on the lift coefficient.
+        The maximal lift coefficient is approximated approximated as a third order polynomial function
+        of the flap deflection angle based on Fig.20 of Ref.1.
+
+        Returns:
+            float: Lift coefficient
+
+        References:
+            [1] Obeid et al., "RANS Simulations of Aerodynamic Performance of NACA 0015 Flapped Airfoil"
+                Fluids 2017, 2(1), 2
+        """
+        # Use angle of attack in degrees
+        angle_of_attack = self.angle_of_attack
+        # Maximal lift coefficient
+        # (approximated as third order polynomial function of the flap deflection angle based on Fig.20 of DOI:10.3390/fluids2010002)
+        Clift_max = self.flap_coefficients()[1]
+        if abs(angle_of_attack) < 15:
+            Clift =  abs(angle_of_attack)/15*Clift_max
+        elif abs(angle_of_attack) < 20:
+            Clift =  (1 - abs(angle_of_attack - 15)/15)*Clift_max
+        else:
+            Clift =  0
+        # Account for turbulences when approaching Match speeds
+        match_speed = (self.horizontal_speed - self.wind_horizontal)/speed_sound
+        if match_speed <= self.profile.critic_match:
+            return Clift
+        elif match_speed <= self.profile.drag_divergence_match:
+            return Clift + 0.1*(match_speed - self.profile.critic_match)
+        else:
+            return Clift + self.profile.lift_divergence_offset - 0.8*(match_speed - self.profile.drag_divergence_match)
+    #------------------------------------------------------------
+    def wheels_drag(self):
+        """Drag factor due to the aircraft's gear.
+
+        Assumes that while gear is down, 25% of the drag originates from the gear [1].
+
+        Returns:
+            float: Gear drag factor
+
+        References:
+            [1] Brandt et al., "The Effects of Wheel Design on the Aerodynamic Drag of Passenger Vehicles,"
+                SAE Int. J. Adv. & Curr. Prac. in Mobility 1(3):1279-1299, 2019,
+        """
+        return 1.333 if self.gear_down else 1
+    #------------------------------------------------------------
+    def drag(self):
+        """Drag force acting on the airplane due to the air flowing around the wings.
+
+        Returns:
+            float: Drag force in N
+        """
+        angle_of_attack = radians(self.angle_of_attack)
+        return self._drag(self.air_rarefaction_factor(), self.airspeed(), cos(angle_of_attack), sin(angle_of_attack))
+
+    def _drag(self, rarefaction, collinear_speed, cos_angle_of_attack, sin_angle_of_attack):
+        # Compute surface area experiencing drag
+        drag_surface = self.profile.front_surface*cos_angle_of_attack +  self.profile.wings_surface*sin_angle_of_attack
+
+        # Account for decrease of lift if spoilers are deployed
+        spoilers_drag_factor = 1
+        if self.spoilers:
+            spoilers_drag_factor = 2.5
+
+        # Compute drag
+        return self.wheels_drag()*0.5*air_density_sea_level*rarefaction*self._drag_coefficient(collinear_speed)*drag_surface*collinear_speed**2*spoilers_drag_factor
+    #------------------------------------------------------------
+    def lift(self):
+        """Lift force acting on the airplane due to the air flowing around the wings.
+
+        Returns:
+            float: Lift force in N
+        """
+        angle_of_attack = radians(self.angle_of_attack)
+        return self._lift(self.air_rarefaction_factor(), cos(angle_of_attack), sin(angle_of_attack))
+
+    def _lift(self, rarefaction, cos_angle_of_attack, sin_angle_of_attack):
+        # Compute surface area experiencing lift
+        lift_surface = self.profile.front_surface*sin_angle_of_attack +  self.profile.wings_surface*cos_angle_of_attack
+
+        # Account for decrease of lift if spoilers are deployed
+        spoilers_lift_factor = 1
+        if self.spoilers:
+            spoilers_lift_factor = 0.5
+
+        # Compute lift
+        return 0.5*air_density_sea_level*rarefaction*self.lift_coefficient()*lift_surface*(self.horizontal_speed - self.wind_horizontal)**2*spoilers_lift_factor
+    #------------------------------------------------------------
+    def thrust(self):
+        """Thrust force acting on the airplane due to the engines.
+
+        Returns:
+            float: Thrust force in N
+        """
+        return self.thrust_level*self.profile.max_thrust*self.air_rarefaction_factor()
+    #------------------------------------------------------------
+    def weight(self):
+        """Weight force acting on the airplane due to gravity.
+
+        Returns:
+            float: Weight force in N
+        """
+        return self.mass()*gravitation # kg*m/s^2
+    #------------------------------------------------------------
+    def friction_wheels(self, applied_force=0):
+        """Friction force acting on the airplane while the gear touches the ground.
+
+        The dynamic friction opposes the motion of the rolling airplane. At rest, the static friction
+        holds the airplane against the applied horizontal force, up to the same friction limit.
+
+        Args:
+            applied_force (float): Horizontal force applied onto the airplane at rest in N
+
+        Returns:
+            float: Friction force in N, counted against the direction of flight
+        """
+        if not (self.gear_down and self.altitude==self.ground):
+            return 0
+        friction_limit = self.profile.friction_coefficient*self.weight()
+        if self.horizontal_speed!=0:
+            return copysign(friction_limit, self.horizontal_speed)
+        else:
+            return max(-friction_limit, min(applied_force, friction_limit))
+    #------------------------------------------------------------
+    def horizontal_force(self):
+        """Total horizontal force being subjected onto the airplane based on Newton's second law.
+
+        Returns:
+            float: Net horizontal force in N
+        """
+        return self.forces()[0]
+    #------------------------------------------------------------
+    def vertical_force(self):
+        """Total vertical force being subjected onto the airplane based on Newton's second law.
+
+        Returns:
+            float: Net vertical force in N
+        """
+        return self.forces()[1]
+    #------------------------------------------------------------
+    def forces(self):
+        """Total horizontal and vertical forces being subjected onto the airplane based on Newton's second law.
+
+        Thrust, drag and lift are evaluated once and shared by both force components.
+
+        Returns:
+            tuple: Net horizontal and vertical forces in N
+        """
+        return self._forces(self.air_rarefaction_factor())
+
+    def _forces(self, rarefaction):
+        # Use angles in radians
+        pitch = radians(self.pitch)
+        angle_of_attack = radians(self.angle_of_attack)
+        cos_pitch, sin_pitch = cos(pitch), sin(pitch)
+        cos_angle_of_attack, sin_angle_of_attack = cos(angle_of_attack), sin(angle_of_attack)
+
+        thrust = self.thrust_level*self.profile.max_thrust*rarefaction
+        airspeed = self.airspeed()
+        drag = self._drag(rarefaction, airspeed, cos_angle_of_attack, sin_angle_of_attack)
+        lift = self._lift(rarefaction, cos_angle_of_attack, sin_angle_of_attack)
+
+        # The drag opposes the speed of the aircraft relative to the air
+        if airspeed>0:
+            horizontal_drag = drag*(self.horizontal_speed - self.wind_horizontal)/airspeed
+            vertical_drag = drag*(self.vertical_speed - self.wind_vertical)/airspeed
+        else:
+            horizontal_drag = vertical_drag = 0
+
+        # Apply Newton's second law to the horizontal and vertical force components
+        horizontal_force = cos_pitch*thrust - horizontal_drag - sin_pitch*lift
+        horizontal_force -= self.friction_wheels(horizontal_force)
+        vertical_force = sin_pitch*thrust - vertical_drag + cos_pitch*lift - self.weight()
+        return horizontal_force, vertical_force
+    #------------------------------------------------------------
+    def step(self, Δt):
+        """
+        Advance the state of the aircraft by one time step.
+
+        A ground contact within the step is located on the trajectory of the aircraft under constant
+        acceleration: the step is split at the time of contact, the touchdown is evaluated at the speed
+        of that instant and the remainder of the step is integrated on the ground. Touchdown outcomes
+        thus only depend on the step size through the forces, which are held over each step.
+
+        Args:
+            Δt (float): Time step in s
+        """
+        # Sample the surrounding wind
+        self.time += Δt
+        if self.wind is not None:
+            self._wind_clock -= Δt
+            if self._wind_clock<=0:
+                self._wind_clock += self.wind_interval
+                self.wind_horizontal, self.wind_vertical = self.wind.sample(self.position, self.altitude, self.time)
+
+        # A contact leaves the aircraft on the ground, where it cannot touch down again:
+        # the second pass integrates the whole remainder of the step
+        remaining = Δt - self._advance(Δt)
+        if remaining>0:
+            self._advance(remaining)
+
+    def _advance(self, Δt):
+        """Integrate the flight physics over Δt or up to the next ground contact.
+
+        Returns:
+            float: Time advanced in s
+        """
+        rarefaction = self.air_rarefaction_factor()
+
+        # Burn fuel
+        fuel_flow = self.profile.max_fuel_flow*self.thrust_level*rarefaction
+        self.mass_fuel -= fuel_flow*Δt
+        # If there is not fuel left, there is not thrust
+        if self.mass_fuel<=0:
+            self.mass_fuel = 0
+            self.thrust_level = 0
+
+        # If the plane is moving through the air, update the slope angle of the flight path relative to the air
+        airspeed = self.airspeed()
+        if airspeed>0:
+            self.slope = degrees(asin((self.vertical_speed - self.wind_vertical)/airspeed))
+        else:
+            self.slope = 0
+        # Update the angle of attack
+        self.angle_of_attack = self.pitch - self.slope
+
+        # Compute the current forces acting on the plane
+        horizontal_force, vertical_force = self._forces(rarefaction)
+        mass = self.mass()
+        horizontal_acceleration = horizontal_force/mass
+        vertical_acceleration = vertical_force/mass
+
+        if self.brakes and self.altitude==self.ground and self.horizontal_speed>0:
+            horizontal_acceleration = horizontal_acceleration - self.profile.braking_deceleration
+
+        if self.brakes and self.altitude==self.ground and self.horizontal_speed<0:
+            horizontal_acceleration = horizontal_acceleration + self.profile.braking_deceleration
+
+        # The wheel friction and the brakes can stop the aircraft but not reverse its motion
+        braking = self.altitude==self.ground and (self.brakes or self.gear_down)
+
+        # If the flying plane reaches the ground within the step, only advance up to the contact
+        # (first root of the height above the ground under constant acceleration, c + (b + a*t/2)*t)
+        slope = self._ground_slope
+        a = vertical_acceleration - slope*horizontal_acceleration
+        b = self.vertical_speed - slope*self.horizontal_speed
+        c = self.altitude - self.ground
+        contact = c>0 and c + (b + a*Δt)*Δt<0
+        # An aircraft on the ground and pressed against it rests there, without touching down
+        resting = c<=0 and c + (b + a*Δt)*Δt<0
+        if contact:
+            discriminant = b*b - 2*a*c
+            duration = min(2*c/(sqrt(discriminant) - b), Δt) if discriminant>=0 else Δt
+            # Give back the fuel of the remainder of the step
+            if self.mass_fuel>0:
+                self.mass_fuel += fuel_flow*(Δt - duration)
+            Δt = duration
+
+        # Compute the acceleration vectors
+        horizontal_speed = self.horizontal_speed + horizontal_acceleration*Δt
+        if braking and horizontal_speed*self.horizontal_speed<0:
+            horizontal_speed = 0
+        self.horizontal_speed = horizontal_speed
+        self.vertical_speed += vertical_acceleration*Δt
+
+        # Update the position of plane
+        self.position += self.horizontal_speed*Δt # m
+        self.altitude += self.vertical_speed*Δt # m
+        if self.terrain is not None:
+            self.ground, self._ground_slope = self.terrain.sample(self.position)
+
+        # If the plane is on the ground, it cannot descend or accelerate further down
+        if contact or self.altitude<self.ground:
+            # Crash if the speed towards the ground is too high
+            kinetic_energy = 1/2*self.mass()*(self.vertical_speed - self._ground_slope*self.horizontal_speed)**2
+            if not resting and kinetic_energy>self.profile.critical_crash_energy:
+                self.crashed = True
+            self.altitude = self.ground
+            self.vertical_speed = 0
+
+        # If the plane exceeds the maximal speed it breaks due to air forces
+        if self.altitude==self.ground and self.pitch>self.profile.tail_strike_pitch:
+            self.crashed = True
+
+        # If the plane exceeds the maximal speed it breaks due to air forces
+        # (the speeds vary linearly within the step, the highest speed is reached at its end)
+        if self.airspeed()>self.profile.max_speed:
+            self.crashed = True
+
+        # If the plane if on the ground, it cannot physically pitch nose down
+        if self.altitude==self.ground and self.pitch<0:
+            self.pitch=0
+
+       # If the plane if on the ground, it cannot physically pitch more than 15deg without the tail touching the ground
+        if self.altitude==self.ground and self.pitch>self.profile.tail_strike_pitch:
+            self.pitch=self.profile.tail_strike_pitch
+        return Δt
+#=========================================================================================================
@@ -0,0 +1,407 @@
+"""
+Controllers flying aircraft instead of the keyboard: scripted autopilots and learned policies.
+
+A controller maps the observations of many aircraft to their actions in a single vectorized call,
+using the columns of EnvironmentPool.OBSERVATIONS and EnvironmentPool.ACTIONS. The same controller
+thus flies the plane of the game (control), all aircraft of a fleet (control_batch) or the
+environments of a pool (evaluate). Controllers can run at a lower rate than the simulation: the
+actions are then held for action_repeat steps.
+
+Usage:
+    controller = Autopilot(destination=AIRPORTS[2], cruise_altitude=1500)
+    controller.control(plane, Δt)                       # single aircraft, every step
+    returns, outcomes = evaluate(pool, controller, steps=36000)
+"""
+import numpy as np
+from math import inf
+from environment import EnvironmentPool, apply_actions
+
+# Columns of the observations and actions
+OBSERVATION = {name: n for n,name in enumerate(EnvironmentPool.OBSERVATIONS)}
+THRUST, PITCH, FLAPS, GEAR, SPOILERS, BRAKES = range(len(EnvironmentPool.ACTIONS))
+
+
+#=========================================================================================================
+def observe(aircraft):
+    """Observations of a single aircraft.
+
+    Args:
+        aircraft (Aircraft): Aircraft to observe
+
+    Returns:
+        numpy.ndarray: Array of shape (1, len(EnvironmentPool.OBSERVATIONS))
+    """
+    return np.array([[getattr(aircraft, name) for name in EnvironmentPool.OBSERVATIONS]], dtype=float)
+#=========================================================================================================
+
+#=========================================================================================================
+def apply(aircraft, actions, pitch_limits=EnvironmentPool.pitch_limits, flap_limits=EnvironmentPool.flap_limits):
+    """Set the controls of a single aircraft, with the restrictions of apply_actions.
+
+    Args:
+        aircraft (Aircraft): Aircraft to control
+        actions (numpy.ndarray): Actions of the aircraft, of length len(EnvironmentPool.ACTIONS)
+        pitch_limits (tuple): Minimal and maximal pitch in deg
+        flap_limits (tuple): Minimal and maximal flap deflection in deg
+    """
+    on_ground = aircraft.altitude==aircraft.ground
+    thrust_level, pitch, flap_deflection, gear_down, spoilers, brakes = [float(action) for action in actions]
+    aircraft.thrust_level = min(max(thrust_level, -1 if on_ground else 0), 1)
+    aircraft.pitch = min(max(pitch, pitch_limits[0]), pitch_limits[1])
+    aircraft.flap_deflection = min(max(flap_deflection, flap_limits[0]), flap_limits[1])
+    aircraft.gear_down = gear_down > 0.5 or on_ground
+    aircraft.spoilers = spoilers > 0.5
+    aircraft.brakes = brakes > 0.5
+#=========================================================================================================
+
+
+class Controller(object):
+    """
+    Base class of the controllers.
+
+    Subclasses implement act, computing the actions of many aircraft at once from their observations.
+
+    Attributes:
+        action_repeat : int
+            Number of simulation steps between two evaluations of the controller.
+    """
+    # Limits of the controls set by control and control_batch (those of the environments)
+    pitch_limits = EnvironmentPool.pitch_limits # deg
+    flap_limits = EnvironmentPool.flap_limits # deg
+
+    def __init__(self, action_repeat=1):
+        self.action_repeat = action_repeat
+        self._actions = None
+        self._countdown = 0
+
+    #------------------------------------------------------------
+    def act(self, observations, Δt):
+        """Actions of the aircraft.
+
+        Args:
+            observations (numpy.ndarray): Observations of shape (size, len(EnvironmentPool.OBSERVATIONS))
+            Δt (float): Time since the previous evaluation in s
+
+        Returns:
+            numpy.ndarray: Actions of shape (size, len(EnvironmentPool.ACTIONS))
+        """
+        raise NotImplementedError
+    #------------------------------------------------------------
+    def reset(self, index=slice(None)):
+        """Forget the internal state of the selected aircraft, e.g. when their episodes restart.
+
+        Args:
+            index (int, slice or numpy.ndarray): Aircraft to reset, all by default
+        """
+        pass
+    #------------------------------------------------------------
+    def __call__(self, observations, Δt):
+        """Actions of the aircraft, evaluating the controller every action_repeat steps.
+
+        Args:
+            observations (numpy.ndarray): Observations of shape (size, len(EnvironmentPool.OBSERVATIONS))
+            Δt (float): Simulation time step in s
+
+        Returns:
+            numpy.ndarray: Actions of shape (size, len(EnvironmentPool.ACTIONS))
+        """
+        if self._countdown <= 0 or self._actions is None or len(self._actions) != len(observations):
+            self._actions = self.act(observations, Δt*self.action_repeat)
+            self._countdown = self.action_repeat
+        self._countdown -= 1
+        return self._actions
+    #------------------------------------------------------------
+    def control(self, aircraft, Δt):
+        """Set the controls of a single aircraft.
+
+        Args:
+            aircraft (Aircraft): Aircraft to control
+            Δt (float): Simulation time step in s
+        """
+        apply(aircraft, self(observe(aircraft), Δt)[0], self.pitch_limits, self.flap_limits)
+    #------------------------------------------------------------
+    def control_batch(self, fleet, Δt):
+        """Set the controls of all aircraft of a fleet.
+
+        Args:
+            fleet (Fleet): Aircraft to control
+            Δt (float): Simulation time step in s
+        """
+        observations = np.stack([getattr(fleet, name) for name in EnvironmentPool.OBSERVATIONS], axis=1).astype(float)
+        apply_actions(fleet, self(observations, Δt), self.pitch_limits, self.flap_limits)
+#=========================================================================================================
+
+
+class PID(object):
+    """
+    Proportional-integral-derivative controllers of many aircraft, in velocity form.
+
+    Every call returns the previous output corrected by the change of the error (proportional), the
+    error (integral) and the change of its slope (derivative). Starting from the current setting of
+    the control, taking over is bumpless, and clipping the output prevents the integral windup.
+
+    Attributes:
+        gains : tuple
+            Proportional, integral (1/s) and derivative (s) gains.
+        limits : tuple
+            Minimal and maximal output.
+    """
+    def __init__(self, proportional, integral=0, derivative=0, limits=(-inf, inf)):
+        self.gains = (proportional, integral, derivative)
+        self.limits = limits
+        self.errors = None
+
+    #------------------------------------------------------------
+    def reset(self, index=slice(None)):
+        """Forget the previous errors of the selected aircraft.
+
+        Args:
+            index (int, slice or numpy.ndarray): Aircraft to reset, all by default
+        """
+        if self.errors is not None:
+            self.errors[:,index] = np.nan
+    #------------------------------------------------------------
+    def __call__(self, output, error, Δt):
+        """Update the outputs.
+
+        Args:
+            output (numpy.ndarray): Current outputs
+            error (numpy.ndarray): Errors to correct
+            Δt (float): Time since the previous call in s
+
+        Returns:
+            numpy.ndarray: New outputs
+        """
+        if self.errors is None or self.errors.shape[1] != len(error):
+            self.errors = np.full((2, len(error)), np.nan)
+        # Without history, the changes of the error are taken as zero
+        previous = np.where(np.isnan(self.errors[0]), error, self.errors[0])
+        before = np.where(np.isnan(self.errors[1]), previous, self.errors[1])
+        proportional, integral, derivative = self.gains
+        output = output + proportional*(error - previous) + integral*error*Δt + derivative*(error - 2*previous + before)/Δt
+        self.errors = np.stack([error, previous])
+        return np.clip(output, *self.limits)
+#=========================================================================================================
+
+
+class HoldController(Controller):
+    """
+    Takeoff followed by an altitude and speed hold.
+
+    On the ground, the aircraft accelerates at full thrust and rotates at the rotation speed. In the
+    air, the altitude error sets a target vertical speed that is held through the pitch, and the
+    speed is held through the thrust. Gear and flaps are retracted after the takeoff.
+
+    Attributes:
+        altitude : float or numpy.ndarray
+            Altitude to hold in m.
+        speed : float or numpy.ndarray
+            Horizontal speed to hold in m/s.
+    """
+    # Autopilot settings
+    rotation_speed = 72 # m/s
+    rotation_pitch = 9 # deg
+    takeoff_flaps = 15 # deg
+    gear_retraction_height = 50 # m
+    flaps_retraction_height = 300 # m
+    altitude_gain = 0.05 # 1/s
+    max_climb_rate = 12 # m/s
+    max_descent_rate = 8 # m/s
+    max_angle_of_attack = 10 # deg
+    pitch_limits = (-5, 12) # deg
+
+    def __init__(self, altitude, speed, action_repeat=1):
+        super().__init__(action_repeat)
+        self.altitude = altitude
+        self.speed = speed
+        self.pitch_controller = PID(0.3, 0.5, 0, self.pitch_limits)
+        self.thrust_controller = PID(0.02, 0.01, 0, (0, 1))
+
+    #------------------------------------------------------------
+    def reset(self, index=slice(None)):
+        self.pitch_controller.reset(index)
+        self.thrust_controller.reset(index)
+    #------------------------------------------------------------
+    def act(self, observations, Δt):
+        altitude = observations[:,OBSERVATION['altitude']]
+        height = altitude - observations[:,OBSERVATION['ground']]
+        speed = observations[:,OBSERVATION['horizontal_speed']]
+        pitch = observations[:,OBSERVATION['pitch']]
+        on_ground = height<=0
+
+        target_vertical_speed = np.clip(self.altitude_gain*(self.altitude - altitude), -self.max_descent_rate, self.max_climb_rate)
+        pitch = self.pitch_controller(pitch, target_vertical_speed - observations[:,OBSERVATION['vertical_speed']], Δt)
+        # Stall protection: never pitch beyond the maximal angle of attack
+        pitch = np.minimum(pitch, observations[:,OBSERVATION['pitch']] - observations[:,OBSERVATION['angle_of_attack']] + self.max_angle_of_attack)
+        thrust_level = self.thrust_controller(observations[:,OBSERVATION['thrust_level']], self.speed - speed, Δt)
+
+        actions = np.zeros((len(observations), len(EnvironmentPool.ACTIONS)))
+        actions[:,THRUST] = np.where(on_ground, 1, thrust_level)
+        actions[:,PITCH] = np.where(on_ground, np.where(speed < self.rotation_speed, 0, self.rotation_pitch), pitch)
+        actions[:,FLAPS] = np.where(height < self.flaps_retraction_height, self.takeoff_flaps, 0)
+        actions[:,GEAR] = height < self.gear_retraction_height
+        return actions
+#=========================================================================================================
+
+
+class ApproachController(Controller):
+    """
+    Approach, flare and rollout on a runway.
+
+    The aircraft descends along a glide path ending at the touchdown point of the runway, at the
+    approach speed with gear and landing flaps down. Close to the ground, the thrust is cut and the
+    descent is slowed down to the flare rate. After the touchdown, the aircraft brakes with
+    spoilers and thrust reversal down to a stop.
+
+    Attributes:
+        runway : float or numpy.ndarray
+            Position of the runway (start of the runway) in m.
+    """
+    # Autopilot settings
+    touchdown_distance = 300 # m after the start of the runway
+    glide_slope = 3 # deg
+    approach_speed = 95 # m/s
+    approach_flaps = 40 # deg
+    glide_path_gain = 0.1 # 1/s
+    flare_height = 12 # m
+    flare_rate = 1.5 # m/s
+    max_descent_rate = 8 # m/s
+    max_angle_of_attack = 12 # deg
+    reverse_thrust = -0.6
+    pitch_limits = (-5, 12) # deg
+
+    def __init__(self, runway, action_repeat=1):
+        super().__init__(action_repeat)
+        self.runway = runway
+        self.pitch_controller = PID(0.3, 0.5, 0, self.pitch_limits)
+        self.thrust_controller = PID(0.02, 0.02, 0, (0, 1))
+
+    #------------------------------------------------------------
+    def reset(self, index=slice(None)):
+        self.pitch_controller.reset(index)
+        self.thrust_controller.reset(index)
+    #------------------------------------------------------------
+    def act(self, observations, Δt):
+        altitude = observations[:,OBSERVATION['altitude']]
+        ground = observations[:,OBSERVATION['ground']]
+        height = altitude - ground
+        speed = observations[:,OBSERVATION['horizontal_speed']]
+        on_ground = height<=0
+        flare = height < self.flare_height
+
+        # Glide path towards the touchdown point, followed by the flare
+        gradient = np.tan(np.radians(self.glide_slope))
+        distance = self.runway + self.touchdown_distance - observations[:,OBSERVATION['position']]
+        glide_path = np.maximum(gradient*distance, 0)
+        target_vertical_speed = np.where(flare, -self.flare_rate,
+                                         np.clip(-gradient*speed + self.glide_path_gain*(glide_path - height), -self.max_descent_rate, 0))
+        pitch = self.pitch_controller(observations[:,OBSERVATION['pitch']], target_vertical_speed - observations[:,OBSERVATION['vertical_speed']], Δt)
+        pitch = np.minimum(pitch, observations[:,OBSERVATION['pitch']] - observations[:,OBSERVATION['angle_of_attack']] + self.max_angle_of_attack)
+        thrust_level = self.thrust_controller(observations[:,OBSERVATION['thrust_level']], self.approach_speed - speed, Δt)
+
+        actions = np.zeros((len(observations), len(EnvironmentPool.ACTIONS)))
+        actions[:,THRUST] = np.where(on_ground, np.where(speed > 10, self.reverse_thrust, 0), np.where(flare, 0, thrust_level))
+        actions[:,PITCH] = np.where(on_ground, 0, pitch)
+        actions[:,FLAPS] = self.approach_flaps
+        actions[:,GEAR] = 1
+        actions[:,SPOILERS] = on_ground
+        actions[:,BRAKES] = on_ground
+        return actions
+#=========================================================================================================
+
+
+class Autopilot(Controller):
+    """
+    Flight to a destination airport: takeoff, climb and cruise, then approach and landing.
+
+    Attributes:
+        destination : float or numpy.ndarray
+            Position of the destination airport in m.
+        hold : HoldController
+            Controller of the takeoff, climb and cruise.
+        approach : ApproachController
+            Controller of the approach and landing.
+    """
+    approach_distance = 5000 # m flown on the glide path before the touchdown point (beyond the descent)
+
+    def __init__(self, destination, cruise_altitude=1500, cruise_speed=150, action_repeat=1):
+        super().__init__(action_repeat)
+        self.destination = destination
+        self.hold = HoldController(cruise_altitude, cruise_speed)
+        self.approach = ApproachController(destination)
+        self._approaching = None
+
+    #------------------------------------------------------------
+    def reset(self, index=slice(None)):
+        self.hold.reset(index)
+        self.approach.reset(index)
+        if self._approaching is not None:
+            self._approaching[index] = False
+    #------------------------------------------------------------
+    def act(self, observations, Δt):
+        # Start the approach at the top of descent of the glide path
+        height = observations[:,OBSERVATION['altitude']] - observations[:,OBSERVATION['ground']]
+        distance = self.destination + self.approach.touchdown_distance - observations[:,OBSERVATION['position']]
+        approach = distance < height/np.tan(np.radians(self.approach.glide_slope)) + self.approach_distance
+
+        # A controller taking over starts from the current controls, without the errors of its previous phase
+        approaching = self._approaching
+        if approaching is None or len(approaching) != len(approach):
+            approaching = np.zeros(len(approach), dtype=bool)
+        self.approach.reset(approach & ~approaching)
+        self.hold.reset(~approach & approaching)
+        self._approaching = approach
+
+        # Only the active controllers are evaluated
+        if approach.all():
+            return self.approach.act(observations, Δt)
+        if not approach.any():
+            return self.hold.act(observations, Δt)
+        return np.where(approach[:,None], self.approach.act(observations, Δt), self.hold.act(observations, Δt))
+#=========================================================================================================
+
+
+class PolicyController(Controller):
+    """
+    Learned policy, e.g. trained on an EnvironmentPool.
+
+    Attributes:
+        policy : callable
+            Function mapping an array of observations to an array of actions.
+    """
+    def __init__(self, policy, action_repeat=1):
+        super().__init__(action_repeat)
+        self.policy = policy
+
+    def act(self, observations, Δt):
+        return np.asarray(self.policy(observations.astype(np.float32)), dtype=float)
+#=========================================================================================================
+
+
+#=========================================================================================================
+def evaluate(pool, controller, steps):
+    """Fly the environments of a pool with a controller, at full simulation speed.
+
+    Args:
+        pool (EnvironmentPool): Environments to fly
+        controller (Controller): Controller of all environments
+        steps (int): Number of simulation steps
+
+    Returns:
+        tuple: Returns of the finished episodes and the mission status at their end (COMPLETED or FAILED,
+            RUNNING if the step limit was reached)
+    """
+    observations = pool.reset()
+    controller.reset()
+    episode_return = np.zeros(pool.size)
+    returns, outcomes = [], []
+    for _ in range(steps):
+        observations, rewards, dones = pool.step(controller(observations, pool.Δt))
+        episode_return += rewards
+        if dones.any():
+            returns.extend(episode_return[dones])
+            outcomes.extend(pool.status[dones])
+            episode_return[dones] = 0
+            controller.reset(np.flatnonzero(dones))
+    return np.array(returns), np.array(outcomes, dtype=int)
+#=========================================================================================================
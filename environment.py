@@ -0,0 +1,193 @@
+import numpy as np
+from aircraft import DEFAULT_PROFILE
+from fleet import Fleet
+from performance import load_performance
+from scenario import MissionBatch, compile_scenario, COMPLETED, FAILED
+from world import AIRPORTS
+
+
+class EnvironmentPool(object):
+    """
+    Pool of headless flight environments stepped together, e.g. for reinforcement learning.
+
+    Every environment flies a mission (see scenario.py), starting with the aircraft standing at
+    the beginning of the runway of the start airport. By default, following the objectives of the
+    game, the aircraft has to take off and stop on the runway of another airport. An episode ends
+    when the mission is completed or failed (e.g. crashing or touching the ground outside of a
+    runway) or when the step limit is reached. Finished environments are reset automatically.
+
+    The reward is the distance flown in km, with a penalty for failing the mission and a bonus
+    for completing it.
+
+    Attributes:
+        fleet : Fleet
+            Flight physics of the aircraft of all environments.
+        size : int
+            Number of environments.
+        Δt : float
+            Simulation time step in s.
+        max_steps : int
+            Maximal number of steps of an episode.
+        steps : numpy.ndarray
+            Number of steps taken in the current episode of each environment.
+        missions : MissionBatch
+            Missions of all environments, environment n flying scenario n modulo the number of scenarios.
+        wind : WindField or None
+            Wind field shared by all environments, calm air if None. Every episode starts at a random
+            time of the wind field so that the environments meet different weather.
+        terrain : Terrain or None
+            Terrain shared by all environments, flat ground if None.
+        status : numpy.ndarray
+            Status of the missions at the end of the last step, before the finished environments were reset.
+    """
+    # Columns of the observation and action arrays
+    OBSERVATIONS = ('horizontal_speed', 'vertical_speed', 'altitude', 'position', 'pitch', 'angle_of_attack',
+                    'thrust_level', 'flap_deflection', 'gear_down', 'spoilers', 'brakes', 'mass_fuel', 'ground')
+    ACTIONS = ('thrust_level', 'pitch', 'flap_deflection', 'gear_down', 'spoilers', 'brakes')
+
+    # Task settings
+    takeoff_altitude = 40 # m
+    landing_speed = 5 # m/s
+    crash_penalty = 10
+    landing_bonus = 10
+
+    # Control limits
+    flap_limits = (0, 50) # deg
+    pitch_limits = (-20, 20) # deg
+
+    def __init__(self, size, profile=DEFAULT_PROFILE, Δt=1/60, max_steps=36000, airports=AIRPORTS, wind=None, seed=None, scenarios=None, terrain=None):
+        self.fleet = Fleet(size, profile)
+        self.fleet.wind = self.wind = wind
+        self.fleet.terrain = self.terrain = terrain
+        self.size = size
+        self.Δt = Δt
+        self.max_steps = max_steps
+        self.airports = airports
+        self.steps = np.zeros(size, dtype=int)
+        if scenarios is None:
+            scenarios = [compile_scenario({'objectives': [{'type': 'takeoff', 'altitude': self.takeoff_altitude},
+                                                          {'type': 'land', 'max_speed': self.landing_speed}]}, airports)]
+        self.missions = MissionBatch([scenarios[n % len(scenarios)] for n in range(size)], airports)
+        self.status = self.missions.status.copy()
+        self.rng = np.random.default_rng(seed)
+        self.profile = profile
+        self._performance = None
+
+    #------------------------------------------------------------
+    def observe(self, observations=None):
+        """Observations of all environments.
+
+        Args:
+            observations (numpy.ndarray, optional): Array of shape (size, len(OBSERVATIONS)) to write into
+
+        Returns:
+            numpy.ndarray: Observations
+        """
+        if observations is None:
+            observations = np.empty((self.size, len(self.OBSERVATIONS)), dtype=np.float32)
+        for n,name in enumerate(self.OBSERVATIONS):
+            observations[:,n] = getattr(self.fleet, name)
+        return observations
+    #------------------------------------------------------------
+    def cruise_range(self):
+        """Distance each aircraft could still fly in steady cruise at its current altitude and thrust.
+
+        The performance tables of the aircraft are loaded on the first call.
+
+        Returns:
+            numpy.ndarray: Ranges in m (NaN where no steady cruise exists)
+        """
+        if self._performance is None:
+            self._performance = load_performance(self.profile)
+        fleet = self.fleet
+        return self._performance.cruise_range_batch(fleet.mass(), fleet.mass_fuel, fleet.altitude, fleet.thrust_level)
+    #------------------------------------------------------------
+    def reset(self, index=slice(None), observations=None):
+        """Reset the selected environments.
+
+        Args:
+            index (int, slice or numpy.ndarray): Environments to reset, all by default
+            observations (numpy.ndarray, optional): Array to write the observations into
+
+        Returns:
+            numpy.ndarray: Observations of all environments
+        """
+        self._restart(index)
+        return self.observe(observations)
+    #------------------------------------------------------------
+    def _restart(self, index):
+        self.fleet.reset(index)
+        self.missions.start(self.fleet, index)
+        self.steps[index] = 0
+        if self.wind is not None:
+            period = self.wind.shape[0]*self.wind.time_spacing
+            self.fleet.time[index] = self.rng.uniform(0, period, self.fleet.time[index].shape)
+    #------------------------------------------------------------
+    def apply(self, actions):
+        """Set the controls of the aircraft (see apply_actions).
+
+        Args:
+            actions (numpy.ndarray): Array of shape (size, len(ACTIONS))
+        """
+        apply_actions(self.fleet, actions, self.pitch_limits, self.flap_limits)
+    #------------------------------------------------------------
+    def step(self, actions, observations=None, rewards=None, dones=None):
+        """Advance all environments by one time step.
+
+        Args:
+            actions (numpy.ndarray): Actions of all environments (see apply)
+            observations (numpy.ndarray, optional): Array to write the observations into
+            rewards (numpy.ndarray, optional): Array to write the rewards into
+            dones (numpy.ndarray, optional): Array to write the episode terminations into
+
+        Returns:
+            tuple: Observations, rewards and episode terminations of all environments
+        """
+        fleet = self.fleet
+        self.apply(actions)
+        position = fleet.position.copy()
+        fleet.step(self.Δt)
+        self.steps += 1
+
+        # Evaluate the objectives
+        status = self.missions.update(fleet, self.Δt)
+        failed = status==FAILED
+        completed = status==COMPLETED
+
+        if rewards is None:
+            rewards = np.empty(self.size, dtype=np.float32)
+        rewards[:] = (fleet.position - position)/1000 - self.crash_penalty*failed + self.landing_bonus*completed
+        if dones is None:
+            dones = np.empty(self.size, dtype=bool)
+        dones[:] = failed | completed | (self.steps >= self.max_steps)
+
+        # Start new episodes in the finished environments
+        finished = np.flatnonzero(dones)
+        self.status[:] = status
+        if finished.size:
+            self._restart(finished)
+        return self.observe(observations), rewards, dones
+#=========================================================================================================
+
+#=========================================================================================================
+def apply_actions(fleet, actions, pitch_limits=EnvironmentPool.pitch_limits, flap_limits=EnvironmentPool.flap_limits):
+    """Set the controls of all aircraft of a fleet.
+
+    The same restrictions as for the keyboard controls of the game apply: thrust reversal is only
+    possible on the ground and the gear cannot be raised on the ground.
+
+    Args:
+        fleet (Fleet): Aircraft to control
+        actions (numpy.ndarray): Array of shape (size, len(EnvironmentPool.ACTIONS)) with the thrust level, pitch in deg,
+            flap deflection in deg and the gear, spoilers and brakes settings (engaged if >0.5)
+        pitch_limits (tuple): Minimal and maximal pitch in deg
+        flap_limits (tuple): Minimal and maximal flap deflection in deg
+    """
+    on_ground = fleet.altitude==fleet.ground
+    fleet.thrust_level[:] = np.clip(actions[:,0], np.where(on_ground, -1, 0), 1)
+    fleet.pitch[:] = np.clip(actions[:,1], *pitch_limits)
+    fleet.flap_deflection[:] = np.clip(actions[:,2], *flap_limits)
+    fleet.gear_down[:] = (actions[:,3] > 0.5) | on_ground
+    fleet.spoilers[:] = actions[:,4] > 0.5
+    fleet.brakes[:] = actions[:,5] > 0.5
+#=========================================================================================================
@@ -0,0 +1,352 @@
+import numpy as np
+from aircraft import Aircraft, load_profile, DEFAULT_PROFILE, speed_sound, gravitation, air_density_sea_level, air_rarefaction_scale
+
+
+class Fleet(object):
+    """
+    Flight physics of many aircraft of the same type, stepped together in a single batched update.
+
+    The force model is the same as the one of the Aircraft class, with every state variable
+    stored as a NumPy array holding one entry per aircraft.
+
+    Attributes:
+        profile : AircraftProfile
+            Technical specifications of the aircraft type.
+        size : int
+            Number of aircraft in the fleet.
+        vertical_speed : numpy.ndarray
+            Vertical speeds of the aircraft in m/s.
+        horizontal_speed : numpy.ndarray
+            Horizontal speeds of the aircraft in m/s.
+        altitude : numpy.ndarray
+            Altitudes of the aircraft above sea level in m.
+        position : numpy.ndarray
+            Positions of the aircraft in m.
+        slope : numpy.ndarray
+            Slopes of the aircraft in deg.
+        angle_of_attack : numpy.ndarray
+            Angles of attack of the aircraft in deg.
+        pitch : numpy.ndarray
+            Pitches of the aircraft in deg.
+        thrust_level : numpy.ndarray
+            Thrust levels of the aircraft.
+        gear_down : numpy.ndarray
+            Indicates whether the gear of each aircraft is down.
+        flap_deflection : numpy.ndarray
+            Flap deflection angles of the aircraft in deg.
+        spoilers : numpy.ndarray
+            Indicates whether the spoilers of each aircraft are deployed.
+        brakes : numpy.ndarray
+            Indicates whether the wheel brakes of each aircraft are engaged.
+        mass_fuel : numpy.ndarray
+            Masses of the aircraft's fuel in kg.
+        crashed : numpy.ndarray
+            Indicates whether each aircraft has crashed.
+        wind : WindField or None
+            Wind field the aircraft fly through, calm air if None.
+        time : numpy.ndarray
+            Elapsed flight times of the aircraft in s.
+        wind_horizontal : numpy.ndarray
+            Horizontal wind components at the aircraft in m/s.
+        wind_vertical : numpy.ndarray
+            Vertical wind components at the aircraft in m/s.
+        terrain : Terrain or None
+            Terrain the aircraft fly over, flat ground at sea level if None.
+        ground : numpy.ndarray
+            Elevations of the ground under the aircraft in m, updated at every step.
+    """
+    wind_interval = Aircraft.wind_interval # s
+
+    def __init__(self, size, profile=DEFAULT_PROFILE):
+        if isinstance(profile, str):
+            profile = load_profile(profile)
+        self.profile = profile
+        self.size = size
+
+        # Aircraft positioning parameters
+        self.vertical_speed = np.zeros(size) # m/s
+        self.horizontal_speed = np.zeros(size) # m/s
+        self.altitude = np.zeros(size) # m
+        self.position = np.zeros(size) # m
+        self.slope = np.zeros(size) # deg
+        self.angle_of_attack = np.zeros(size) # deg
+
+        # Aircraft control properties
+        self.pitch = np.zeros(size) # deg
+        self.thrust_level = np.zeros(size)
+        self.gear_down = np.ones(size, dtype=bool)
+        self.flap_deflection = np.zeros(size) # deg
+        self.spoilers = np.zeros(size, dtype=bool)
+        self.brakes = np.zeros(size, dtype=bool)
+
+        # Aircraft loading
+        self.mass_fuel = np.full(size, float(profile.mass_fuel)) # kg
+        self.crashed = np.zeros(size, dtype=bool)
+
+        # Surrounding air
+        self.wind = None
+        self.time = np.zeros(size) # s
+        self.wind_horizontal = np.zeros(size) # m/s
+        self.wind_vertical = np.zeros(size) # m/s
+        self._wind_clock = 0 # s
+
+        # Ground under the aircraft
+        self.terrain = None
+        self.ground = np.zeros(size) # m
+        self._ground_slope = np.zeros(size)
+
+    #------------------------------------------------------------
+    def reset(self, index):
+        """Put the selected aircraft back into their initial state (standing on the ground, full tanks).
+
+        Args:
+            index (int, slice or numpy.ndarray): Aircraft to reset
+        """
+        for array in (self.vertical_speed, self.horizontal_speed, self.altitude, self.position, self.slope,
+                      self.angle_of_attack, self.pitch, self.thrust_level, self.flap_deflection, self.time,
+                      self.ground, self._ground_slope):
+            array[index] = 0
+        self.gear_down[index] = True
+        self.spoilers[index] = False
+        self.brakes[index] = False
+        self.mass_fuel[index] = self.profile.mass_fuel
+        self.crashed[index] = False
+    #------------------------------------------------------------
+    def mass(self):
+        """Total masses of the aircraft
+
+        Returns:
+            numpy.ndarray: Masses in kg
+        """
+        return self.profile.mass_aircraft + self.mass_fuel
+    #------------------------------------------------------------
+    def air_rarefaction_factor(self):
+        """Approximate air density reduction factors due to altitude
+
+        Returns:
+            numpy.ndarray: Air rarefaction factors
+        """
+        return np.exp(-air_rarefaction_scale*self.altitude)
+    #------------------------------------------------------------
+    def collinear_speed(self):
+        """Speeds collinear with the aircraft's directions
+
+        Returns:
+            numpy.ndarray: Collinear speeds in m/s
+        """
+        return np.hypot(self.horizontal_speed, self.vertical_speed)
+    #------------------------------------------------------------
+    def airspeed(self):
+        """Speeds of the aircraft relative to the surrounding air
+
+        Returns:
+            numpy.ndarray: Airspeeds in m/s
+        """
+        return np.hypot(self.horizontal_speed - self.wind_horizontal, self.vertical_speed - self.wind_vertical)
+    #------------------------------------------------------------
+    def flap_coefficients(self):
+        """Minimal drag and maximal lift coefficients for the current flap deflections.
+
+        Returns:
+            tuple: Minimal drag coefficients and maximal lift coefficients
+        """
+        flap_deflection = self.flap_deflection
+        d0, d1, d2, d3 = self.profile.drag_flap_coefficients
+        l0, l1, l2, l3 = self.profile.lift_flap_coefficients
+        Cdrag_min = d0 + flap_deflection*(d1 + flap_deflection*(d2 + flap_deflection*d3))
+        Clift_max = l0 + flap_deflection*(l1 + flap_deflection*(l2 + flap_deflection*l3))
+        return Cdrag_min, Clift_max
+    #------------------------------------------------------------
+    def drag_coefficient(self, collinear_speed, Cdrag_min):
+        """Drag coefficients of the aircraft (see Aircraft.drag_coefficient).
+
+        Args:
+            collinear_speed (numpy.ndarray): Collinear speeds in m/s
+            Cdrag_min (numpy.ndarray): Minimal drag coefficients
+
+        Returns:
+            numpy.ndarray: Drag coefficients
+        """
+        Cdrag = Cdrag_min + (0.02*self.angle_of_attack)**2
+        match_speed = collinear_speed/speed_sound
+        subsonic = match_speed < self.profile.critic_match
+        return np.where(
+            subsonic,
+            Cdrag/np.sqrt(1 - np.where(subsonic, match_speed, 0)**2),
+            Cdrag*(15*(match_speed - self.profile.critic_match) + self.profile.match_drag_factor),
+        )
+    #------------------------------------------------------------
+    def lift_coefficient(self, Clift_max):
+        """Lift coefficients of the aircraft (see Aircraft.lift_coefficient).
+
+        Args:
+            Clift_max (numpy.ndarray): Maximal lift coefficients
+
+        Returns:
+            numpy.ndarray: Lift coefficients
+        """
+        angle_of_attack = self.angle_of_attack
+        abs_angle_of_attack = np.abs(angle_of_attack)
+        Clift = np.select(
+            [abs_angle_of_attack < 15, abs_angle_of_attack < 20],
+            [abs_angle_of_attack/15*Clift_max, (1 - np.abs(angle_of_attack - 15)/15)*Clift_max],
+            0,
+        )
+        match_speed = (self.horizontal_speed - self.wind_horizontal)/speed_sound
+        critic_match = self.profile.critic_match
+        drag_divergence_match = self.profile.drag_divergence_match
+        return Clift + np.select(
+            [match_speed <= critic_match, match_speed <= drag_divergence_match],
+            [0, 0.1*(match_speed - critic_match)],
+            self.profile.lift_divergence_offset - 0.8*(match_speed - drag_divergence_match),
+        )
+    #------------------------------------------------------------
+    def forces(self, rarefaction=None):
+        """Total horizontal and vertical forces being subjected onto the aircraft based on Newton's second law.
+
+        Args:
+            rarefaction (numpy.ndarray, optional): Air rarefaction factors, computed if not given
+
+        Returns:
+            tuple: Net horizontal and vertical forces in N
+        """
+        profile = self.profile
+        if rarefaction is None:
+            rarefaction = self.air_rarefaction_factor()
+        airspeed = self.airspeed()
+        Cdrag_min, Clift_max = self.flap_coefficients()
+
+        # Use angles in radians
+        pitch = np.radians(self.pitch)
+        angle_of_attack = np.radians(self.angle_of_attack)
+        cos_pitch, sin_pitch = np.cos(pitch), np.sin(pitch)
+        cos_angle_of_attack, sin_angle_of_attack = np.cos(angle_of_attack), np.sin(angle_of_attack)
+        air_density = air_density_sea_level*rarefaction
+
+        thrust = self.thrust_level*profile.max_thrust*rarefaction
+        drag_surface = profile.front_surface*cos_angle_of_attack + profile.wings_surface*sin_angle_of_attack
+        drag = (np.where(self.gear_down, 1.333, 1)*np.where(self.spoilers, 2.5, 1)
+                *0.5*air_density*self.drag_coefficient(airspeed, Cdrag_min)*drag_surface*airspeed**2)
+        lift_surface = profile.front_surface*sin_angle_of_attack + profile.wings_surface*cos_angle_of_attack
+        lift = (np.where(self.spoilers, 0.5, 1)
+                *0.5*air_density*self.lift_coefficient(Clift_max)*lift_surface*(self.horizontal_speed - self.wind_horizontal)**2)
+        weight = self.mass()*gravitation
+
+        # The drag opposes the speed of the aircraft relative to the air
+        moving = airspeed>0
+        drag_per_airspeed = np.where(moving, drag, 0)/np.where(moving, airspeed, 1)
+        horizontal_drag = drag_per_airspeed*(self.horizontal_speed - self.wind_horizontal)
+        vertical_drag = drag_per_airspeed*(self.vertical_speed - self.wind_vertical)
+
+        # The wheel friction opposes the rolling motion, or holds the aircraft at rest up to its limit
+        horizontal_force = cos_pitch*thrust - horizontal_drag - sin_pitch*lift
+        friction_limit = np.where(self.gear_down & (self.altitude==self.ground), profile.friction_coefficient*weight, 0)
+        friction_wheels = np.where(self.horizontal_speed!=0, np.sign(self.horizontal_speed)*friction_limit,
+                                   np.clip(horizontal_force, -friction_limit, friction_limit))
+
+        # Apply Newton's second law to the horizontal and vertical force components
+        horizontal_force = horizontal_force - friction_wheels
+        vertical_force = sin_pitch*thrust - vertical_drag + cos_pitch*lift - weight
+        return horizontal_force, vertical_force
+    #------------------------------------------------------------
+    def step(self, Δt):
+        """
+        Advance the state of all aircraft by one time step (see Aircraft.step).
+
+        The aircraft reaching the ground within the step are advanced up to their contact first,
+        the remainders of their steps are then integrated together in a second pass.
+
+        Args:
+            Δt (float): Time step in s
+        """
+        # Sample the surrounding wind of all aircraft at once
+        self.time += Δt
+        if self.wind is not None:
+            self._wind_clock -= Δt
+            if self._wind_clock<=0:
+                self._wind_clock += self.wind_interval
+                self.wind_horizontal, self.wind_vertical = self.wind.sample_batch(self.position, self.altitude, self.time)
+
+        # A contact leaves an aircraft on the ground, where it cannot touch down again:
+        # the second pass integrates the whole remainder of the step
+        remaining = Δt - self._advance(Δt)
+        if np.any(remaining>0):
+            self._advance(remaining)
+
+    def _advance(self, Δt):
+        """Integrate the flight physics of every aircraft over Δt or up to its next ground contact.
+
+        Args:
+            Δt (float or numpy.ndarray): Time steps in s
+
+        Returns:
+            numpy.ndarray: Times advanced in s
+        """
+        profile = self.profile
+        rarefaction = self.air_rarefaction_factor()
+
+        # Burn fuel, without fuel there is no thrust
+        fuel_flow = profile.max_fuel_flow*self.thrust_level*rarefaction
+        self.mass_fuel -= fuel_flow*Δt
+        empty = self.mass_fuel<=0
+        self.mass_fuel[empty] = 0
+        self.thrust_level[empty] = 0
+
+        # Update the slope angles of the flight paths relative to the air and the angles of attack
+        airspeed = self.airspeed()
+        moving = airspeed>0
+        self.slope = np.where(moving, np.degrees(np.arcsin((self.vertical_speed - self.wind_vertical)/np.where(moving, airspeed, 1))), 0)
+        self.angle_of_attack = self.pitch - self.slope
+
+        # Compute the current accelerations of the aircraft
+        horizontal_force, vertical_force = self.forces(rarefaction)
+        mass = self.mass()
+        horizontal_acceleration = horizontal_force/mass
+        vertical_acceleration = vertical_force/mass
+        braking = self.brakes & (self.altitude==self.ground)
+        horizontal_acceleration -= np.where(braking, np.sign(self.horizontal_speed)*profile.braking_deceleration, 0)
+        # The wheel friction and the brakes can stop the aircraft but not reverse its motion
+        braking |= self.gear_down & (self.altitude==self.ground)
+
+        # Flying aircraft reaching the ground within the step only advance up to the contact
+        Δt = np.full(self.size, Δt, dtype=float) if np.ndim(Δt)==0 else np.array(Δt, dtype=float)
+        a = vertical_acceleration - self._ground_slope*horizontal_acceleration
+        b = self.vertical_speed - self._ground_slope*self.horizontal_speed
+        c = self.altitude - self.ground
+        contact = (c>0) & (c + (b + a*Δt)*Δt<0)
+        # Aircraft on the ground and pressed against it rest there, without touching down
+        resting = (c<=0) & (c + (b + a*Δt)*Δt<0)
+        if contact.any():
+            a, b, c = a[contact], b[contact], c[contact]
+            # First root of the height above the ground under constant acceleration, c + (b + a*t/2)*t
+            discriminant = b*b - 2*a*c
+            reached = discriminant>=0
+            duration = np.where(reached, np.minimum(2*c/(np.sqrt(np.where(reached, discriminant, 0)) - b), Δt[contact]), Δt[contact])
+            self.mass_fuel[contact] += np.where(empty[contact], 0, fuel_flow[contact]*(Δt[contact] - duration))
+            Δt[contact] = duration
+
+        # Integrate the speeds and positions
+        horizontal_speed = self.horizontal_speed + horizontal_acceleration*Δt
+        self.horizontal_speed = np.where(braking & (horizontal_speed*self.horizontal_speed<0), 0, horizontal_speed)
+        self.vertical_speed += vertical_acceleration*Δt
+        self.position += self.horizontal_speed*Δt # m
+        self.altitude += self.vertical_speed*Δt # m
+        if self.terrain is not None:
+            self.ground, self._ground_slope = self.terrain.sample_batch(self.position)
+
+        # Aircraft on the ground cannot descend further, crash if the touchdown is too hard
+        touchdown = contact | (self.altitude<self.ground)
+        kinetic_energy = 0.5*mass*(self.vertical_speed - self._ground_slope*self.horizontal_speed)**2
+        self.crashed |= touchdown & ~resting & (kinetic_energy>profile.critical_crash_energy)
+        self.altitude[touchdown] = self.ground[touchdown]
+        self.vertical_speed[touchdown] = 0
+
+        # Tail strikes and overspeed break the aircraft
+        on_ground = self.altitude==self.ground
+        self.crashed |= on_ground & (self.pitch>profile.tail_strike_pitch)
+        self.crashed |= self.airspeed()>profile.max_speed
+
+        # On the ground, the aircraft can neither pitch nose down nor beyond the tail strike pitch
+        self.pitch = np.where(on_ground, np.clip(self.pitch, 0, profile.tail_strike_pitch), self.pitch)
+        return Δt
+#=========================================================================================================
@@ -0,0 +1,250 @@
+"""
+Linearization of the flight dynamics, e.g. for model-predictive control and trim solvers.
+
+The time derivative of the state of the aircraft and its Jacobian with respect to the speeds,
+altitude and controls are computed analytically in a single evaluation of the force model of
+Aircraft.step, carrying the partial derivatives of every intermediate quantity along.
+
+Usage:
+    derivative, jacobian = linearize(plane)
+    derivatives, jacobians = linearize_batch(fleet)
+
+The analytic Jacobians are checked against finite differences of the force model (finite_differences)
+in tests/test_linearization.py.
+"""
+import numpy as np
+from math import degrees, asin
+from aircraft import Aircraft, speed_sound, gravitation, air_density_sea_level, air_rarefaction_scale
+
+# Rows of the state derivative and of the Jacobians
+STATES = ('position', 'altitude', 'horizontal_speed', 'vertical_speed', 'mass_fuel')
+# Columns of the Jacobians
+VARIABLES = ('horizontal_speed', 'vertical_speed', 'altitude', 'pitch', 'thrust_level', 'flap_deflection')
+U, W, H, PITCH, THRUST, FLAPS = range(len(VARIABLES))
+
+
+#=========================================================================================================
+def _linearize(profile, horizontal_speed, vertical_speed, altitude, pitch, thrust_level, flap_deflection,
+               mass_fuel, gear_down, spoilers, brakes, on_ground, wind_horizontal, wind_vertical):
+    """State derivatives and Jacobians of arrays of states (see linearize_batch).
+
+    Every quantity q of the force model comes with its gradient dq of shape (n, len(VARIABLES)).
+    """
+    n = horizontal_speed.size
+    unit = np.eye(len(VARIABLES))
+    zeros = lambda: np.zeros((n, len(VARIABLES)))
+
+    # Speed relative to the air and slope of the flight path (radians)
+    u, w = horizontal_speed - wind_horizontal, vertical_speed - wind_vertical
+    airspeed = np.hypot(u, w)
+    moving = airspeed>0
+    V = np.where(moving, airspeed, 1)
+    dairspeed = zeros()
+    dairspeed[:,U] = np.where(moving, u/V, 0)
+    dairspeed[:,W] = np.where(moving, w/V, 0)
+    sin_slope = np.where(moving, w/V, 0)
+    cos_slope = np.where(moving, np.abs(u)/V, 1)
+    dslope = zeros()
+    dslope[:,U] = np.where(moving, -w*np.sign(u)/V**2, 0)
+    dslope[:,W] = np.where(moving, np.abs(u)/V**2, 0)
+    # Direction of the speed relative to the air, opposed by the drag
+    direction_u = np.where(moving, u/V, 0)
+    ddirection_u = zeros()
+    ddirection_u[:,U] = np.where(moving, w**2/V**3, 0)
+    ddirection_u[:,W] = np.where(moving, -u*w/V**3, 0)
+
+    # Angle of attack in degrees and radians
+    angle_of_attack = pitch - np.degrees(np.arcsin(sin_slope))
+    dangle_of_attack = unit[PITCH] - np.degrees(dslope)
+    cos_angle_of_attack, sin_angle_of_attack = np.cos(np.radians(angle_of_attack)), np.sin(np.radians(angle_of_attack))
+    dangle_of_attack_radians = np.radians(dangle_of_attack)
+
+    # Air rarefaction
+    rarefaction = np.exp(-air_rarefaction_scale*altitude)
+    drarefaction = zeros()
+    drarefaction[:,H] = -air_rarefaction_scale*rarefaction
+
+    # Flap polynomials
+    d0, d1, d2, d3 = profile.drag_flap_coefficients
+    l0, l1, l2, l3 = profile.lift_flap_coefficients
+    δ = flap_deflection
+    Cdrag_min = d0 + δ*(d1 + δ*(d2 + δ*d3))
+    Clift_max = l0 + δ*(l1 + δ*(l2 + δ*l3))
+    dCdrag_min = np.outer(d1 + δ*(2*d2 + 3*δ*d3), unit[FLAPS])
+    dClift_max = np.outer(l1 + δ*(2*l2 + 3*δ*l3), unit[FLAPS])
+
+    # Drag coefficient
+    Cdrag = Cdrag_min + (0.02*angle_of_attack)**2
+    dCdrag = dCdrag_min + (2*0.02**2*angle_of_attack)[:,None]*dangle_of_attack
+    match_speed = airspeed/speed_sound
+    dmatch_speed = dairspeed/speed_sound
+    subsonic = match_speed < profile.critic_match
+    compressibility = np.where(subsonic, 1/np.sqrt(np.where(subsonic, 1 - match_speed**2, 1)),
+                               15*(match_speed - profile.critic_match) + profile.match_drag_factor)
+    dcompressibility = np.where(subsonic, match_speed*compressibility**3, 15)[:,None]*dmatch_speed
+    dCdrag = dCdrag*compressibility[:,None] + Cdrag[:,None]*dcompressibility
+    Cdrag = Cdrag*compressibility
+
+    # Lift coefficient
+    magnitude = np.abs(angle_of_attack)
+    linear, stalled = magnitude < 15, (magnitude >= 15) & (magnitude < 20)
+    shape = np.select([linear, stalled], [magnitude/15, 1 - np.abs(angle_of_attack - 15)/15], 0)
+    dshape = np.select([linear, stalled], [np.sign(angle_of_attack)/15, -np.sign(angle_of_attack - 15)/15], 0)
+    Clift = shape*Clift_max
+    dClift = dshape[:,None]*dangle_of_attack*Clift_max[:,None] + shape[:,None]*dClift_max
+    lift_match_speed = u/speed_sound
+    transonic = (lift_match_speed > profile.critic_match) & (lift_match_speed <= profile.drag_divergence_match)
+    divergent = lift_match_speed > profile.drag_divergence_match
+    Clift = Clift + np.select([transonic, divergent], [0.1*(lift_match_speed - profile.critic_match),
+                              profile.lift_divergence_offset - 0.8*(lift_match_speed - profile.drag_divergence_match)], 0)
+    dClift[:,U] += np.select([transonic, divergent], [0.1, -0.8], 0)/speed_sound
+
+    # Drag and lift forces
+    drag_surface = profile.front_surface*cos_angle_of_attack + profile.wings_surface*sin_angle_of_attack
+    ddrag_surface = (profile.wings_surface*cos_angle_of_attack - profile.front_surface*sin_angle_of_attack)[:,None]*dangle_of_attack_radians
+    drag_factor = np.where(gear_down, 1.333, 1)*np.where(spoilers, 2.5, 1)*0.5*air_density_sea_level
+    drag = drag_factor*rarefaction*Cdrag*drag_surface*airspeed**2
+    ddrag = drag_factor[:,None]*(drarefaction*(Cdrag*drag_surface*airspeed**2)[:,None]
+                                 + dCdrag*(rarefaction*drag_surface*airspeed**2)[:,None]
+                                 + ddrag_surface*(rarefaction*Cdrag*airspeed**2)[:,None]
+                                 + dairspeed*(2*rarefaction*Cdrag*drag_surface*airspeed)[:,None])
+    lift_surface = profile.front_surface*sin_angle_of_attack + profile.wings_surface*cos_angle_of_attack
+    dlift_surface = (profile.front_surface*cos_angle_of_attack - profile.wings_surface*sin_angle_of_attack)[:,None]*dangle_of_attack_radians
+    lift_factor = np.where(spoilers, 0.5, 1)*0.5*air_density_sea_level
+    lift = lift_factor*rarefaction*Clift*lift_surface*u**2
+    dlift = lift_factor[:,None]*(drarefaction*(Clift*lift_surface*u**2)[:,None]
+                                 + dClift*(rarefaction*lift_surface*u**2)[:,None]
+                                 + dlift_surface*(rarefaction*Clift*u**2)[:,None])
+    dlift[:,U] += lift_factor*2*rarefaction*Clift*lift_surface*u
+
+    # Thrust, none without fuel
+    fueled = mass_fuel>0
+    thrust_level = np.where(fueled, thrust_level, 0)
+    thrust = thrust_level*profile.max_thrust*rarefaction
+    dthrust = profile.max_thrust*(np.outer(np.where(fueled, rarefaction, 0), unit[THRUST]) + thrust_level[:,None]*drarefaction)
+
+    # Net forces
+    pitch_radians = np.radians(pitch)
+    cos_pitch, sin_pitch = np.cos(pitch_radians), np.sin(pitch_radians)
+    dpitch = np.radians(unit[PITCH])
+    mass = profile.mass_aircraft + mass_fuel
+    weight = mass*gravitation
+    horizontal_force = cos_pitch*thrust - direction_u*drag - sin_pitch*lift
+    dhorizontal_force = (cos_pitch[:,None]*dthrust - (sin_pitch*thrust)[:,None]*dpitch
+                         - direction_u[:,None]*ddrag - drag[:,None]*ddirection_u
+                         - sin_pitch[:,None]*dlift - (cos_pitch*lift)[:,None]*dpitch)
+    # The wheel friction opposes the rolling motion, or holds the aircraft at rest up to its limit
+    friction_limit = np.where(gear_down & on_ground, profile.friction_coefficient*weight, 0)
+    rolling = horizontal_speed!=0
+    held = ~rolling & (np.abs(horizontal_force)<=friction_limit)
+    horizontal_force = horizontal_force - np.where(rolling, np.sign(horizontal_speed)*friction_limit,
+                                                   np.clip(horizontal_force, -friction_limit, friction_limit))
+    dhorizontal_force[held] = 0
+    vertical_force = sin_pitch*thrust - sin_slope*drag + cos_pitch*lift - weight
+    dvertical_force = (sin_pitch[:,None]*dthrust + (cos_pitch*thrust)[:,None]*dpitch
+                       - sin_slope[:,None]*ddrag - (cos_slope*drag)[:,None]*dslope
+                       + cos_pitch[:,None]*dlift - (sin_pitch*lift)[:,None]*dpitch)
+
+    horizontal_acceleration = horizontal_force/mass - np.where(brakes & on_ground, np.sign(horizontal_speed)*profile.braking_deceleration, 0)
+    vertical_acceleration = vertical_force/mass
+    fuel_flow = profile.max_fuel_flow*thrust_level*rarefaction
+    dfuel_flow = profile.max_fuel_flow/profile.max_thrust*dthrust
+
+    derivative = np.stack([horizontal_speed, vertical_speed, horizontal_acceleration, vertical_acceleration, -fuel_flow], axis=1)
+    jacobian = np.stack([unit[U] + zeros(), unit[W] + zeros(), dhorizontal_force/mass[:,None],
+                         dvertical_force/mass[:,None], -dfuel_flow], axis=1)
+    return derivative, jacobian
+#=========================================================================================================
+
+#=========================================================================================================
+def linearize_batch(fleet):
+    """State derivatives and Jacobians of all aircraft of a fleet.
+
+    The derivatives are those integrated by Fleet.step for the current speeds and controls, with the
+    slope and angle of attack following the speeds and the wind held constant. The ground constraints
+    (touchdown, pitch limits) are not part of the dynamics; on the ground, the wheel friction and the
+    brakes are included in the derivatives but do not depend on the variables, except for the static
+    friction holding an aircraft at rest, which cancels the horizontal force and its derivatives.
+
+    Args:
+        fleet (Fleet): Aircraft to linearize
+
+    Returns:
+        tuple: Derivatives of shape (size, len(STATES)) and Jacobians of shape (size, len(STATES), len(VARIABLES))
+    """
+    return _linearize(fleet.profile, fleet.horizontal_speed, fleet.vertical_speed, fleet.altitude, fleet.pitch,
+                      fleet.thrust_level, fleet.flap_deflection, fleet.mass_fuel, fleet.gear_down, fleet.spoilers,
+                      fleet.brakes, fleet.altitude==fleet.ground, fleet.wind_horizontal*np.ones(fleet.size),
+                      fleet.wind_vertical*np.ones(fleet.size))
+#=========================================================================================================
+
+#=========================================================================================================
+def linearize(aircraft):
+    """State derivative and Jacobian of a single aircraft (see linearize_batch).
+
+    Args:
+        aircraft (Aircraft): Aircraft to linearize
+
+    Returns:
+        tuple: Derivative of shape (len(STATES),) and Jacobian of shape (len(STATES), len(VARIABLES))
+    """
+    state = [np.array([value], dtype=dtype) for value,dtype in (
+        (aircraft.horizontal_speed, float), (aircraft.vertical_speed, float), (aircraft.altitude, float),
+        (aircraft.pitch, float), (aircraft.thrust_level, float), (aircraft.flap_deflection, float),
+        (aircraft.mass_fuel, float), (aircraft.gear_down, bool), (aircraft.spoilers, bool), (aircraft.brakes, bool),
+        (aircraft.altitude==aircraft.ground, bool), (aircraft.wind_horizontal, float), (aircraft.wind_vertical, float))]
+    derivative, jacobian = _linearize(aircraft.profile, *state)
+    return derivative[0], jacobian[0]
+#=========================================================================================================
+
+#=========================================================================================================
+def state_derivative(aircraft):
+    """State derivative of a single aircraft evaluated by the force model of the Aircraft class.
+
+    Args:
+        aircraft (Aircraft): Aircraft
+
+    Returns:
+        numpy.ndarray: Derivative of shape (len(STATES),)
+    """
+    # Slope and angle of attack follow the speeds as in Aircraft.step
+    airspeed = aircraft.airspeed()
+    aircraft.slope = degrees(asin((aircraft.vertical_speed - aircraft.wind_vertical)/airspeed)) if airspeed>0 else 0
+    aircraft.angle_of_attack = aircraft.pitch - aircraft.slope
+    thrust_level = aircraft.thrust_level
+    if aircraft.mass_fuel<=0:
+        aircraft.thrust_level = 0
+    horizontal_force, vertical_force = aircraft.forces()
+    horizontal_acceleration = horizontal_force/aircraft.mass()
+    if aircraft.brakes and aircraft.altitude==aircraft.ground and aircraft.horizontal_speed!=0:
+        horizontal_acceleration -= np.sign(aircraft.horizontal_speed)*aircraft.profile.braking_deceleration
+    fuel_flow = aircraft.profile.max_fuel_flow*aircraft.thrust_level*aircraft.air_rarefaction_factor()
+    aircraft.thrust_level = thrust_level
+    return np.array([aircraft.horizontal_speed, aircraft.vertical_speed, horizontal_acceleration,
+                     vertical_force/aircraft.mass(), -fuel_flow])
+#=========================================================================================================
+
+#=========================================================================================================
+def finite_differences(aircraft, steps=(1e-4, 1e-4, 1e-2, 1e-5, 1e-6, 1e-5)):
+    """Jacobian of a single aircraft by central finite differences of state_derivative.
+
+    Args:
+        aircraft (Aircraft): Aircraft, left unchanged
+        steps (tuple): Step of each variable
+
+    Returns:
+        numpy.ndarray: Jacobian of shape (len(STATES), len(VARIABLES))
+    """
+    jacobian = np.empty((len(STATES), len(VARIABLES)))
+    for n,(name,step) in enumerate(zip(VARIABLES, steps)):
+        value = getattr(aircraft, name)
+        setattr(aircraft, name, value + step)
+        forward = state_derivative(aircraft)
+        setattr(aircraft, name, value - step)
+        backward = state_derivative(aircraft)
+        setattr(aircraft, name, value)
+        jacobian[:,n] = (forward - backward)/(2*step)
+    state_derivative(aircraft)
+    return jacobian
+#=========================================================================================================
+
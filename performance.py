@@ -0,0 +1,330 @@
+"""
+Cruise performance planning.
+
+Steady level flight (clean configuration) is solved once per aircraft profile from the force model
+of the Fleet class, over a grid of masses, altitudes and thrust levels. The resulting tables are
+cached on disk and answer fuel, range and endurance queries by interpolation.
+
+Usage:
+    performance = load_performance('a320-232')
+    performance.cruise_range(plane.mass(), plane.mass_fuel, plane.altitude, plane.thrust_level)
+"""
+import os
+import hashlib
+from functools import lru_cache
+from math import exp, nan
+import numpy as np
+from aircraft import load_profile, DEFAULT_PROFILE, air_rarefaction_scale
+from fleet import Fleet
+
+# Directory of the cached performance tables
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'flight-simulator')
+
+# Grid of the performance tables: number of masses, altitudes (m) and thrust levels
+MASSES = 9
+ALTITUDES = (0, 12000, 49) # m
+THRUST_LEVELS = (0.1, 1, 19)
+
+# Solver settings
+SPEED_SAMPLES = 48
+ITERATIONS = 24
+MAX_ANGLE_OF_ATTACK = 15 # deg
+
+# Version of the force model the tables are solved with, to increment whenever the model changes
+# so that the tables cached by earlier versions are not loaded anymore
+MODEL_VERSION = 2
+
+
+class PerformanceTable(object):
+    """
+    Steady cruise performance of an aircraft type.
+
+    The tables hold the true airspeed and pitch of level flight for every combination of mass,
+    altitude and thrust level (NaN where no steady cruise exists below the maximal speed), and the
+    cumulative range obtained by burning fuel from the empty mass up to each mass. All axes are
+    evenly spaced, so that queries locate their grid cells by index arithmetic.
+
+    Attributes:
+        profile : AircraftProfile
+            Technical specifications of the aircraft type.
+        masses : numpy.ndarray
+            Masses of the grid in kg.
+        altitudes : numpy.ndarray
+            Altitudes of the grid in m.
+        thrust_levels : numpy.ndarray
+            Thrust levels of the grid.
+        speed : numpy.ndarray
+            Cruise speeds of shape (masses, altitudes, thrust levels) in m/s.
+        pitch : numpy.ndarray
+            Cruise pitches of shape (masses, altitudes, thrust levels) in deg.
+        distance : numpy.ndarray
+            Cumulative ranges of shape (masses, altitudes, thrust levels) in m.
+        ceiling : numpy.ndarray
+            Highest altitude of the grid with a steady cruise at full thrust for every mass in m.
+    """
+    def __init__(self, profile, masses, altitudes, thrust_levels, speed, pitch, distance):
+        self.profile = profile
+        self.masses = masses
+        self.altitudes = altitudes
+        self.thrust_levels = thrust_levels
+        self.speed = speed
+        self.pitch = pitch
+        self.distance = distance
+        feasible = np.isfinite(speed[:,:,-1])
+        self.ceiling = np.where(feasible.any(axis=1), np.max(np.where(feasible, altitudes, -np.inf), axis=1), nan)
+
+        # Grid layout and flat copies of the tables for the scalar queries
+        self._axes = [(float(axis[0]), float(axis[-1] - axis[0])/(axis.size - 1), axis.size) for axis in (masses, altitudes, thrust_levels)]
+        self._speed = speed.ravel().tolist()
+        self._pitch = pitch.ravel().tolist()
+        self._distance = distance.ravel().tolist()
+
+    #------------------------------------------------------------
+    def _cell(self, mass, altitude, thrust_level):
+        """Flat indices and weights of the grid points surrounding a state (None outside of the grid)."""
+        indices, weights = [0], [1.0]
+        for value,(start,step,count) in zip((mass, altitude, thrust_level), self._axes):
+            x = (value - start)/step
+            # Snap onto the grid points so that their values do not mix with infeasible neighbours
+            if abs(x - round(x)) < 1e-9:
+                x = round(x)
+            if not 0 <= x <= count - 1:
+                return None
+            i = int(x)
+            f = x - i
+            if f:
+                indices = [index*count + j for index in indices for j in (i, i + 1)]
+                weights = [weight*w for weight in weights for w in (1 - f, f)]
+            else:
+                indices = [index*count + i for index in indices]
+        return indices, weights
+
+    def _interpolate(self, table, cell):
+        if cell is None:
+            return nan
+        return sum([weight*table[index] for index,weight in zip(*cell)])
+    #------------------------------------------------------------
+    def cruise(self, mass, altitude, thrust_level):
+        """Steady level flight of the aircraft.
+
+        Args:
+            mass (float): Total mass in kg
+            altitude (float): Altitude in m
+            thrust_level (float): Thrust level
+
+        Returns:
+            tuple: True airspeed in m/s and pitch in deg (NaN if no steady cruise exists)
+        """
+        cell = self._cell(mass, altitude, thrust_level)
+        return self._interpolate(self._speed, cell), self._interpolate(self._pitch, cell)
+    #------------------------------------------------------------
+    def fuel_flow(self, altitude, thrust_level):
+        """Fuel burnt per second (see Aircraft.step).
+
+        Args:
+            altitude (float or numpy.ndarray): Altitude in m
+            thrust_level (float or numpy.ndarray): Thrust level
+
+        Returns:
+            float or numpy.ndarray: Fuel flow in kg/s
+        """
+        return self.profile.max_fuel_flow*thrust_level*np.exp(-air_rarefaction_scale*altitude)
+    #------------------------------------------------------------
+    def endurance(self, mass_fuel, altitude, thrust_level):
+        """Time until the tanks are empty.
+
+        Args:
+            mass_fuel (float): Mass of the fuel in kg
+            altitude (float): Altitude in m
+            thrust_level (float): Thrust level
+
+        Returns:
+            float: Endurance in s (infinite without thrust)
+        """
+        fuel_flow = self.profile.max_fuel_flow*thrust_level*exp(-air_rarefaction_scale*altitude)
+        return mass_fuel/fuel_flow if fuel_flow > 0 else float('inf')
+    #------------------------------------------------------------
+    def cruise_range(self, mass, mass_fuel, altitude, thrust_level):
+        """Distance flown in steady cruise until the tanks are empty.
+
+        Args:
+            mass (float): Total mass in kg
+            mass_fuel (float): Mass of the fuel in kg
+            altitude (float): Altitude in m
+            thrust_level (float): Thrust level
+
+        Returns:
+            float: Range in m (NaN if no steady cruise exists)
+        """
+        full = self._interpolate(self._distance, self._cell(mass, altitude, thrust_level))
+        empty = self._interpolate(self._distance, self._cell(mass - mass_fuel, altitude, thrust_level))
+        return full - empty
+    #------------------------------------------------------------
+    def cruise_range_batch(self, mass, mass_fuel, altitude, thrust_level):
+        """Distances flown in steady cruise until the tanks are empty, e.g. for all aircraft of a fleet.
+
+        Args:
+            mass (numpy.ndarray): Total masses in kg
+            mass_fuel (numpy.ndarray): Masses of the fuel in kg
+            altitude (numpy.ndarray): Altitudes in m
+            thrust_level (numpy.ndarray): Thrust levels
+
+        Returns:
+            numpy.ndarray: Ranges in m (NaN where no steady cruise exists)
+        """
+        return (self.interpolate_batch(self.distance, mass, altitude, thrust_level)
+                - self.interpolate_batch(self.distance, np.asarray(mass) - mass_fuel, altitude, thrust_level))
+    #------------------------------------------------------------
+    def interpolate_batch(self, table, mass, altitude, thrust_level):
+        """Interpolate a table at many states.
+
+        Args:
+            table (numpy.ndarray): Table of shape (masses, altitudes, thrust levels)
+            mass (numpy.ndarray): Total masses in kg
+            altitude (numpy.ndarray): Altitudes in m
+            thrust_level (numpy.ndarray): Thrust levels
+
+        Returns:
+            numpy.ndarray: Interpolated values (NaN outside of the grid)
+        """
+        indices, fractions, inside = [], [], True
+        for value,(start,step,count) in zip(np.broadcast_arrays(mass, altitude, thrust_level), self._axes):
+            x = (value - start)/step
+            x = np.where(np.abs(x - np.round(x)) < 1e-9, np.round(x), x)
+            inside = inside & (x >= 0) & (x <= count - 1)
+            i = np.clip(x.astype(int), 0, count - 2)
+            indices.append(i)
+            fractions.append(np.clip(x - i, 0, 1))
+        (i, j, k), (fi, fj, fk) = indices, fractions
+        result = 0
+        for di in (0, 1):
+            for dj in (0, 1):
+                for dk in (0, 1):
+                    weight = (fi if di else 1 - fi)*(fj if dj else 1 - fj)*(fk if dk else 1 - fk)
+                    result = result + np.where(weight > 0, weight*table[i + di, j + dj, k + dk], 0)
+        return np.where(inside, result, nan)
+    #------------------------------------------------------------
+    def save(self, path):
+        """Save the tables into a .npz file.
+
+        Args:
+            path (str): Path of the file
+        """
+        np.savez_compressed(path, masses=self.masses, altitudes=self.altitudes, thrust_levels=self.thrust_levels,
+                            speed=self.speed, pitch=self.pitch, distance=self.distance)
+#=========================================================================================================
+
+
+#=========================================================================================================
+def _trim(fleet, speed):
+    """Pitch holding level flight at the given speeds and remaining horizontal force.
+
+    The angle of attack equals the pitch in level flight. The pitch is found by bisection, the
+    vertical force increasing with the angle of attack below the stall.
+
+    Returns:
+        tuple: Pitches in deg and horizontal forces in N (NaN where the lift cannot carry the weight)
+    """
+    def forces(pitch):
+        fleet.pitch[:] = pitch
+        fleet.angle_of_attack[:] = pitch
+        return fleet.forces()
+
+    fleet.horizontal_speed[:] = speed
+    low, high = np.zeros(fleet.size), np.full(fleet.size, MAX_ANGLE_OF_ATTACK - 1e-6)
+    feasible = forces(high)[1] >= 0
+    for _ in range(ITERATIONS):
+        middle = (low + high)/2
+        climbing = forces(middle)[1] > 0
+        high = np.where(climbing, middle, high)
+        low = np.where(climbing, low, middle)
+    pitch = (low + high)/2
+    return np.where(feasible, pitch, nan), np.where(feasible, forces(pitch)[0], nan)
+#=========================================================================================================
+
+#=========================================================================================================
+def compute_performance(profile=DEFAULT_PROFILE):
+    """Solve the steady cruise of an aircraft type over the whole grid.
+
+    For every grid point, the speeds between the stall and the maximal speed are scanned for the
+    fastest equilibrium of thrust and drag (the front side of the drag curve), which is then
+    refined by bisection.
+
+    Args:
+        profile (str or AircraftProfile): Aircraft profile
+
+    Returns:
+        PerformanceTable: Performance tables of the aircraft
+    """
+    if isinstance(profile, str):
+        profile = load_profile(profile)
+    masses = np.linspace(profile.mass_aircraft, profile.mass_aircraft + profile.mass_fuel, MASSES)
+    altitudes = np.linspace(*ALTITUDES)
+    thrust_levels = np.linspace(*THRUST_LEVELS)
+    mass, altitude, thrust_level = [axis.ravel() for axis in np.meshgrid(masses, altitudes, thrust_levels, indexing='ij')]
+
+    # Clean configuration in level flight
+    fleet = Fleet(mass.size, profile)
+    fleet.gear_down[:] = False
+    fleet.mass_fuel[:] = mass - profile.mass_aircraft
+    fleet.altitude[:] = altitude
+    fleet.thrust_level[:] = thrust_level
+
+    # Bracket the fastest speed at which the thrust balances the drag
+    speeds = np.linspace(30, profile.max_speed, SPEED_SAMPLES)
+    excess = np.array([_trim(fleet, speed)[1] for speed in speeds])
+    crossing = (excess[:-1] > 0) & (excess[1:] <= 0)
+    found = crossing.any(axis=0)
+    last = SPEED_SAMPLES - 2 - np.argmax(crossing[::-1], axis=0)
+    low, high = speeds[last], speeds[last + 1]
+
+    for _ in range(ITERATIONS):
+        middle = (low + high)/2
+        accelerating = _trim(fleet, middle)[1] > 0
+        low = np.where(accelerating, middle, low)
+        high = np.where(accelerating, high, middle)
+    speed = (low + high)/2
+    pitch = _trim(fleet, speed)[0]
+    speed = np.where(found & np.isfinite(pitch), speed, nan).reshape(masses.size, altitudes.size, thrust_levels.size)
+    pitch = np.where(np.isfinite(speed.ravel()), pitch, nan).reshape(speed.shape)
+
+    # Cumulative range: integral of the distance flown per kilogram of fuel over the mass
+    specific_range = speed/(profile.max_fuel_flow*thrust_levels*np.exp(-air_rarefaction_scale*altitudes[:,None]))
+    steps = 0.5*(specific_range[1:] + specific_range[:-1])*np.diff(masses)[:,None,None]
+    distance = np.concatenate([np.zeros((1,) + speed.shape[1:]), np.cumsum(steps, axis=0)])
+    return PerformanceTable(profile, masses, altitudes, thrust_levels, speed, pitch, distance)
+#=========================================================================================================
+
+#=========================================================================================================
+@lru_cache(maxsize=None)
+def load_performance(profile=DEFAULT_PROFILE):
+    """Performance tables of an aircraft type, computed once and cached on disk.
+
+    The cached tables are identified by the specifications of the profile, the grid and the version
+    of the force model, so that editing a profile or the model computes new tables.
+
+    Args:
+        profile (str): Name of a profile in the profiles directory or path to a JSON profile file
+
+    Returns:
+        PerformanceTable: Performance tables of the aircraft
+    """
+    specifications = load_profile(profile)
+    key = hashlib.sha1(repr((tuple(specifications), MASSES, ALTITUDES, THRUST_LEVELS, SPEED_SAMPLES, ITERATIONS,
+                             MAX_ANGLE_OF_ATTACK, MODEL_VERSION)).encode()).hexdigest()
+    path = os.path.join(CACHE_DIR, f'performance-{key[:16]}.npz')
+    if os.path.isfile(path):
+        with np.load(path) as data:
+            return PerformanceTable(specifications, data['masses'], data['altitudes'], data['thrust_levels'],
+                                    data['speed'], data['pitch'], data['distance'])
+    performance = compute_performance(specifications)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write to a temporary file first so that concurrent processes never read a partial file
+        temporary = f'{path}.{os.getpid()}.npz'
+        performance.save(temporary)
+        os.replace(temporary, path)
+    except OSError:
+        pass
+    return performance
+#=========================================================================================================
@@ -0,0 +1,484 @@
+import os
+import contextlib
+with contextlib.redirect_stdout(None):
+    import pygame
+from math import ceil, cos, radians, floor
+from functools import lru_cache
+import numpy as np
+from aircraft import load_profile, DEFAULT_PROFILE
+from world import AIRPORTS, RUNWAY_LENGTH, GROUND_HEIGHT, RUNWAY_HEIGHT, MARKINGS_LENGTH, CITY_EXTENSION
+
+# Directory containing the sprites
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+# Color definitions
+background_sky_color = (87, 184, 250)
+white =  (255,255,255)
+grey = (92,94,93)
+yellow = (239,166,35)
+green = (0,154,23)
+brown = (128, 96, 67)
+
+# Background mountain sprites for parallax effect (from the furthest to the closest layer)
+parallax_speed = [0.1,0.14,0.25,0.27,0.30,0.35,0.4,0.45,0.5,0.55,0.6,0.65,0.7,0.75,0.80,0.85]
+bgYs = [1840, 1350, 1200, 780, 720, 400, 400, 240, 240, 240, 40,  190, 37, 0, 0,-20]
+bgYs = [x/8 for x in bgYs]
+bg_scale = 0.3
+vertical_scroll_factor = 0.15
+
+# Background city sprites for parallax effect
+city_parallax_speed = [0.9,0.95,1]
+city_bgYs = [1,0,-1]
+
+# Size of the plane sprites relative to the original images
+ZOOM_OUT = 2.8
+
+#=========================================================================================================
+def airport_layout(airport_position, first=False):
+    """Layout of an airport: terminal and runway surfaces.
+
+    Arguments:
+    airport_position : float
+        Position of the airport in meters
+    first : bool
+        Whether the airport is the departure airport (terminal placed at the beginning of the runway)
+
+    Returns:
+    tuple
+        Position of the terminal in meters and list of the (x, y, length, height, color) of the runway surfaces
+    """
+    terminal = airport_position+100 if first else airport_position+RUNWAY_LENGTH-300
+    surfaces = [
+        (airport_position-CITY_EXTENSION, RUNWAY_HEIGHT*3/4, RUNWAY_LENGTH+20+2*CITY_EXTENSION, 2*RUNWAY_HEIGHT, (210,210,210)),
+        (airport_position, RUNWAY_HEIGHT*3/4, RUNWAY_LENGTH+20, 2*RUNWAY_HEIGHT, (194,194,194)),
+        (airport_position, RUNWAY_HEIGHT/2, RUNWAY_LENGTH, 2*RUNWAY_HEIGHT, grey),
+    ]
+    for n in range(round(RUNWAY_LENGTH/15/2)):
+        surfaces.append((airport_position + 2*n*15 + 2, 0.25, 15, 0.5, yellow))
+    for n in range(5):
+        surfaces.append((airport_position+2, RUNWAY_HEIGHT/2 - 2*n - 0.25, MARKINGS_LENGTH/2, 0.5, yellow))
+        surfaces.append((airport_position+RUNWAY_LENGTH-MARKINGS_LENGTH, RUNWAY_HEIGHT/2 - 2*n - 0.25, MARKINGS_LENGTH/2 - 2, 0.5, yellow))
+    return terminal, surfaces
+#=========================================================================================================
+
+#=========================================================================================================
+@lru_cache(maxsize=None)
+def load_sprite(name, alpha=True):
+    """Load a sprite from the assets directory.
+
+    The sprite is converted to the display format when a display is available. Sprites are loaded
+    only once, the returned surface must not be modified.
+
+    Arguments:
+    name : str
+        File name of the sprite
+    alpha : bool
+        Whether the sprite has transparent pixels
+
+    Returns:
+    PyGame.Surface
+        The sprite
+    """
+    sprite = pygame.image.load(os.path.join(ASSETS_DIR, name))
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        sprite = sprite.convert_alpha() if alpha else sprite.convert()
+    return sprite
+#=========================================================================================================
+
+
+class TerrainSprites(object):
+    """
+    Pre-rendered segments of the terrain profile, drawn when they first become visible.
+
+    The elevations are drawn at the vertical scale of the scene (vertical_scroll_factor), so that
+    the terrain meets the wheels of the planes when they touch the ground. Only the most recently drawn segments are kept.
+
+    Attributes:
+        terrain : Terrain
+            Terrain to draw.
+        segment_length : float
+            Length of the pre-rendered segments in meters.
+        cache_size : int
+            Maximal number of segments kept.
+    """
+    segment_length = 500 # m
+
+    def __init__(self, terrain, pixel_to_length, pixel_to_height, cache_size=16):
+        self.terrain = terrain
+        self.pixel_to_length = pixel_to_length
+        self.elevation_to_pixel = vertical_scroll_factor/pixel_to_height
+        self.cache_size = cache_size
+        self._segments = {}
+
+    #------------------------------------------------------------
+    def draw(self, surface, left, ground_line):
+        """Draw the visible terrain.
+
+        Arguments:
+        surface : PyGame.Surface
+            Surface to draw on
+        left : float
+            Position at the left edge of the surface in meters
+        ground_line : float
+            Vertical pixel coordinate of the elevation 0 on the surface
+        """
+        right = left + surface.get_width()*self.pixel_to_length
+        for index in range(floor(left/self.segment_length), floor(right/self.segment_length) + 1):
+            sprite = self._segment(index)
+            if sprite is not None:
+                surface.blit(sprite, ((index*self.segment_length - left)/self.pixel_to_length, ground_line - sprite.get_height()))
+    #------------------------------------------------------------
+    def _segment(self, index):
+        # Reuse a drawn segment (moved to the end as the most recently used) or draw it
+        if index in self._segments:
+            sprite = self._segments.pop(index)
+        else:
+            sprite = self._render(index)
+            if len(self._segments) >= self.cache_size:
+                self._segments.pop(next(iter(self._segments)))
+        self._segments[index] = sprite
+        return sprite
+    #------------------------------------------------------------
+    def _render(self, index):
+        """Draw a segment, its bottom edge lying at elevation 0 (None where the ground is flat)."""
+        columns = max(1, ceil(self.segment_length/self.pixel_to_length))
+        positions = index*self.segment_length + self.pixel_to_length*np.arange(columns + 1)
+        elevation = self.terrain.sample_batch(positions)[0]*self.elevation_to_pixel
+        height = ceil(elevation.max())
+        if height < 1:
+            return None
+        outline = list(zip(range(columns + 1), (height - elevation).tolist()))
+        sprite = pygame.Surface((columns, height), pygame.SRCALPHA)
+        pygame.draw.polygon(sprite, brown, [(0, height)] + outline + [(columns, height)])
+        pygame.draw.lines(sprite, green, False, outline, 2)
+        return sprite
+#=========================================================================================================
+
+
+class Scene(object):
+    """
+    Scene of the game at a given resolution: parallax layers, city backgrounds, terrain, airports,
+    clouds, AI traffic and the plane, the camera following the plane.
+
+    The scene is drawn by both the game and the offscreen renderer. All sprites are rescaled once
+    when the scene is created, at the scale of the frames relative to the game's native resolution.
+    Clouds are placed deterministically from a seed so that the same state always yields the same frame.
+    The plane, the terrain, the clouds and the AI traffic share the reduced vertical scale of the
+    altitudes (vertical_scroll_factor), so that their heights on the frame can be compared.
+
+    Attributes:
+        profile : AircraftProfile
+            Technical specifications of the plane.
+        resolution : tuple
+            Width and height of the scene in pixels.
+        scale : float
+            Scale of the scene relative to the game's native resolution.
+        pixel_to_length : float
+            Length in meters of a pixel.
+        pixel_to_height : float
+            Height in meters of a pixel.
+        plane_x : float
+            Horizontal pixel coordinate of the plane.
+        takeoff_height : float
+            Vertical pixel coordinate of the plane on the ground.
+        follow_altitude : float
+            Altitude in meters above which the camera follows the plane.
+    """
+    # Pitch step of the rotated plane sprites, which are reused for all pitches within a step
+    pitch_step = 0.1 # deg
+
+    def __init__(self, profile=DEFAULT_PROFILE, resolution=(160,120), scale=1/6, terrain=None, seed=0, terrain_cache_size=16):
+        if isinstance(profile, str):
+            profile = load_profile(profile)
+        self.profile = profile
+        self.resolution = W, H = resolution
+        self.scale = scale
+
+        # Plane sprites and mapping of the physical distances to pixels
+        gear_down = pygame.transform.flip(load_sprite('plane_gear_down.png'),True,False)
+        gear_up = pygame.transform.flip(load_sprite('plane_gear_up.png'),True,False)
+        self.plane_size = [x/ZOOM_OUT*scale for x in gear_down.get_size()]
+        self.gear_down_sprite = pygame.transform.smoothscale(gear_down, self.plane_size)
+        self.gear_up_sprite = pygame.transform.smoothscale(gear_up, self.plane_size)
+        self.crash_sprite = pygame.transform.smoothscale(load_sprite('crash.png'), (2*self.plane_size[0],self.plane_size[0]))
+        self.pixel_to_length = profile.length/self.plane_size[0]
+        self.pixel_to_height = profile.height/self.plane_size[1]
+        self._rotated_sprites = {}
+
+        # Position of the plane on the frame and altitude from which the camera follows it
+        self.plane_x = W/4
+        self.takeoff_height = H - GROUND_HEIGHT/self.pixel_to_height - 4/5*self.plane_size[1]
+        self.follow_altitude = (self.takeoff_height - H/3)*self.pixel_to_height/vertical_scroll_factor
+
+        # Background sprites
+        self.bgs = []
+        for n in range(len(bgYs)-1,-1,-1):
+            bg = load_sprite(f'pixel_parallax_{n}.png')
+            self.bgs.append(pygame.transform.scale(bg, (bg_scale*scale*bg.get_width(), bg_scale*scale*bg.get_height())))
+        self.city_bgs = []
+        for n in range(3,0,-1):
+            bg = load_sprite(f'city_parallax_{n}.png')
+            self.city_bgs.append(pygame.transform.scale(bg, (scale*bg.get_width(), scale*bg.get_height())))
+
+        # Airports
+        airport_image = load_sprite('airport.png')
+        self.airport_image = pygame.transform.scale(airport_image, [x/9*scale for x in airport_image.get_size()])
+        self.airports = [airport_layout(airport_position, first=n==0) for n,airport_position in enumerate(AIRPORTS)]
+
+        # Terrain
+        self.terrain_sprites = None
+        if terrain is not None:
+            self.terrain_sprites = TerrainSprites(terrain, self.pixel_to_length, self.pixel_to_height, cache_size=terrain_cache_size)
+
+        # Clouds, placed along the route from the seed
+        cloud_image = load_sprite('cloud1.png')
+        self.cloud_images = [pygame.transform.scale(cloud_image, [x*size*scale for x in cloud_image.get_size()]) for size in range(1,5)]
+        rng = np.random.default_rng(seed)
+        count = int((AIRPORTS[-1] + 2*RUNWAY_LENGTH)/300)
+        self.cloud_positions = np.sort(rng.uniform(-RUNWAY_LENGTH, AIRPORTS[-1] + RUNWAY_LENGTH, count))
+        self.cloud_altitudes = rng.uniform(250, 3000, count)
+        self.cloud_sizes = rng.integers(0, 4, count)
+        self.cloud_extent = max(image.get_width() for image in self.cloud_images)*self.pixel_to_length
+
+    #------------------------------------------------------------
+    def draw(self, surface, position, altitude, pitch, gear_down, crashed, ground=0, traffic=None):
+        """Draw the scene around the plane.
+
+        Arguments:
+        surface : PyGame.Surface
+            Surface to draw on, of the resolution of the scene
+        position : float
+            Position of the plane in meters
+        altitude : float
+            Altitude of the plane in meters
+        pitch : float
+            Pitch of the plane in degrees
+        gear_down : bool
+            Whether the gear of the plane is down
+        crashed : bool
+            Whether the plane has crashed
+        ground : float
+            Elevation of the terrain below the plane in meters
+        traffic : Traffic
+            AI traffic to draw, if any
+        """
+        W, H = self.resolution
+        pixel_to_length, pixel_to_height = self.pixel_to_length, self.pixel_to_height
+
+        # Vertical transform shared by the plane, the terrain and every object at an altitude: the altitudes
+        # are drawn at the vertical scale of the plane (vertical_scroll_factor) above the ground line,
+        # which scrolls down once the plane reaches a third of the frame
+        altitude_to_pixel = vertical_scroll_factor/pixel_to_height
+        scroll = max(0, altitude - self.follow_altitude)*altitude_to_pixel
+        ground_line = H - GROUND_HEIGHT/pixel_to_height + scroll
+
+        # Ranges of distances/altitudes on the frame
+        left = position - self.plane_x*pixel_to_length
+        right = left + W*pixel_to_length
+        bottom = (ground_line - H)/altitude_to_pixel
+        top = ground_line/altitude_to_pixel
+
+        surface.fill(background_sky_color)
+
+        # Parallax backgrounds
+        for bg,speed,bgY in zip(self.bgs,parallax_speed,bgYs):
+            width = bg.get_width()
+            posY = H - (bgY + vertical_scroll_factor*GROUND_HEIGHT)/pixel_to_height + scroll - bg.get_height()
+            if posY > H:
+                continue
+            start = -((speed*left/pixel_to_length) % width)
+            for n in range(ceil(W/width) + 1):
+                surface.blit(bg, (start + n*width, posY))
+
+        # City backgrounds around the airports
+        for airport_position in AIRPORTS:
+            city_start, city_end = airport_position - CITY_EXTENSION, airport_position + RUNWAY_LENGTH + CITY_EXTENSION
+            if city_start > right or city_end < left:
+                continue
+            for bg,speed,bgY in zip(self.city_bgs,city_parallax_speed,city_bgYs):
+                width = bg.get_width()
+                posY = H - (bgY + vertical_scroll_factor*GROUND_HEIGHT)/pixel_to_height + scroll - bg.get_height()
+                start = speed*(city_start - left)/pixel_to_length
+                for n in range(ceil((city_end - city_start)/pixel_to_length/width)):
+                    posX = start + n*width
+                    if posX < W and posX + width > 0:
+                        surface.blit(bg, (posX, posY))
+
+        # Terrain
+        if self.terrain_sprites is not None:
+            self.terrain_sprites.draw(surface, left, ground_line)
+
+        # Airports, their surfaces spread in depth around the ground line
+        for terminal, rectangles in self.airports:
+            if rectangles[0][0] > right or rectangles[0][0] + rectangles[0][2] < left:
+                continue
+            surface.blit(self.airport_image, ((terminal - left)/pixel_to_length,
+                                              ground_line - RUNWAY_HEIGHT*3/4/pixel_to_height - self.airport_image.get_height()))
+            for x, y, length, height, color in rectangles:
+                if x > right or x + length < left:
+                    continue
+                pygame.draw.rect(surface, color, ((x - left)/pixel_to_length, ground_line - y/pixel_to_height,
+                                                  length/pixel_to_length, height/pixel_to_height))
+
+        # Shadow of the plane, on the ground below it
+        if not crashed:
+            shadow = pygame.Surface((max(1, 0.9*self.profile.length*cos(radians(pitch))/pixel_to_length), max(1, 0.3/pixel_to_height)))
+            shadow.set_alpha(150)
+            shadow.fill((20,20,20))
+            surface.blit(shadow, (self.plane_x + 0.05*self.profile.length/pixel_to_length,
+                                  ground_line - ground*altitude_to_pixel - 0.15/pixel_to_height))
+
+        # Clouds
+        first, last = np.searchsorted(self.cloud_positions, (left - self.cloud_extent, right))
+        for n in range(first, last):
+            if bottom <= self.cloud_altitudes[n] <= top:
+                self._blit(surface, self.cloud_images[self.cloud_sizes[n]], self.cloud_positions[n], self.cloud_altitudes[n], left, ground_line)
+
+        # AI traffic, drawn as the plane
+        if traffic is not None:
+            fleet = traffic.fleet
+            margin = max(self.plane_size)/altitude_to_pixel
+            for n in traffic.visible((left - self.profile.length, right), (bottom - margin, top + margin)):
+                self._draw_plane(surface, (fleet.position[n] - left)/pixel_to_length,
+                                 self._plane_y(fleet.altitude[n], ground_line), fleet.pitch[n], fleet.gear_down[n])
+
+        # Plane, or its wreck on the ground
+        if crashed:
+            self._blit(surface, self.crash_sprite, position, ground, left, ground_line)
+        else:
+            self._draw_plane(surface, self.plane_x, self._plane_y(altitude, ground_line), pitch, gear_down)
+    #------------------------------------------------------------
+    def _blit(self, surface, sprite, x, y, left, ground_line):
+        """Draw a sprite whose lower-left corner lies at the given position and altitude in meters."""
+        surface.blit(sprite, ((x - left)/self.pixel_to_length, ground_line - y*vertical_scroll_factor/self.pixel_to_height - sprite.get_height()))
+    #------------------------------------------------------------
+    def _plane_y(self, altitude, ground_line):
+        """Vertical pixel coordinate of the top of a plane sprite, its wheels at the given altitude."""
+        return ground_line - altitude*vertical_scroll_factor/self.pixel_to_height - 4/5*self.plane_size[1]
+    #------------------------------------------------------------
+    def _rotated_sprite(self, gear_down, pitch):
+        """Plane sprite rotated to the nearest pitch step, with the pitch it is rotated by."""
+        key = (bool(gear_down), round(pitch/self.pitch_step)*self.pitch_step)
+        if key not in self._rotated_sprites:
+            original_sprite = self.gear_down_sprite if gear_down else self.gear_up_sprite
+            self._rotated_sprites[key] = pygame.transform.rotozoom(original_sprite, key[1], 1)
+        return key[1], self._rotated_sprites[key]
+    #------------------------------------------------------------
+    def _draw_plane(self, surface, x, y, pitch, gear_down):
+        """Draw a plane sprite whose top-left corner, before its rotation, lies at the given pixel coordinates."""
+        plane_size = self.plane_size
+
+        # Rotate the sprite about the back wheels
+        pitch, rotated_sprite = self._rotated_sprite(gear_down, pitch)
+        pivot_wheels_pos = pygame.math.Vector2(x+plane_size[0]-plane_size[0]*2.8/5,  y+plane_size[1]-plane_size[1]/5)
+        rotated_offset = (pivot_wheels_pos - (x + plane_size[0]/2, y + plane_size[1]/2)).rotate(-pitch)
+        surface.blit(rotated_sprite, rotated_sprite.get_rect(center=pivot_wheels_pos - rotated_offset))
+#=========================================================================================================
+
+
+class OffscreenRenderer(object):
+    """
+    Renders the scene of the game offscreen, e.g. as pixel observations for vision-based agents.
+
+    The scene is the one of the game (see Scene), optionally with the instrument panel, drawn
+    directly at the requested resolution. Every frame of the batch is drawn into a surface sharing
+    its memory with the `frames` array, so the rendered pixels are available as NumPy arrays
+    without any copy.
+
+    Attributes:
+        resolution : tuple
+            Width and height of the frames in pixels.
+        scale : float
+            Scale of the frames relative to the game's native resolution.
+        hud : bool
+            Whether the instrument panel is drawn.
+        scene : Scene
+            Scene drawn into the frames.
+        frames : numpy.ndarray
+            Rendered frames of shape (batch, height, width, 4) in RGBX format.
+        pixels : numpy.ndarray
+            View of the RGB channels of the frames, of shape (batch, height, width, 3).
+    """
+    def __init__(self, profile=DEFAULT_PROFILE, resolution=(160,120), scale=1/6, batch=1, hud=False, seed=0, terrain=None):
+        self.resolution = W, H = resolution
+        self.scale = scale
+        self.hud = hud
+        self.scene = Scene(profile, resolution, scale, terrain=terrain, seed=seed, terrain_cache_size=64)
+
+        # Frames shared with the surfaces they are drawn into
+        self.frames = np.zeros((batch, H, W, 4), dtype=np.uint8)
+        self.surfaces = [pygame.image.frombuffer(frame, resolution, 'RGBX') for frame in self.frames]
+        self.pixels = self.frames[...,:3]
+
+        if hud:
+            pygame.font.init()
+            self.font = pygame.font.SysFont('consolas', max(8, round(17*scale)))
+
+    #------------------------------------------------------------
+    def render(self, aircraft, index=0):
+        """Render the scene around an aircraft.
+
+        Arguments:
+        aircraft : Aircraft
+            The aircraft to follow
+        index : int
+            Frame of the batch to render into
+
+        Returns:
+        numpy.ndarray
+            View of the rendered RGB frame of shape (height, width, 3)
+        """
+        self._draw(self.surfaces[index], aircraft.position, aircraft.altitude, aircraft.pitch, aircraft.gear_down,
+                   aircraft.crashed, aircraft.ground, self._indicators(aircraft) if self.hud else None)
+        return self.pixels[index]
+    #------------------------------------------------------------
+    def render_batch(self, fleet):
+        """Render the scene around every aircraft of a fleet, one frame per aircraft.
+
+        Arguments:
+        fleet : Fleet
+            The aircraft to follow
+
+        Returns:
+        numpy.ndarray
+            View of the rendered RGB frames of shape (fleet.size, height, width, 3)
+
+        Raises:
+        ValueError
+            If the fleet has more aircraft than the batch of the renderer
+        """
+        if fleet.size > len(self.surfaces):
+            raise ValueError(f'Cannot render a fleet of {fleet.size} aircraft into a batch of {len(self.surfaces)} frames')
+        for n in range(fleet.size):
+            indicators = self._indicators(fleet, n) if self.hud else None
+            self._draw(self.surfaces[n], fleet.position[n], fleet.altitude[n], fleet.pitch[n], fleet.gear_down[n],
+                       fleet.crashed[n], fleet.ground[n], indicators)
+        return self.pixels[:fleet.size]
+    #------------------------------------------------------------
+    def _indicators(self, aircraft, n=None):
+        value = (lambda name: getattr(aircraft, name)) if n is None else (lambda name: getattr(aircraft, name)[n])
+        return [
+            f'Thrust: {value("thrust_level")*100:.0f} %',
+            f'Flaps: {value("flap_deflection"):.0f}°',
+            f'Pitch: {value("pitch"):.1f}°',
+            f'H.Speed: {value("horizontal_speed"):.1f} m/s',
+            f'V.Speed: {value("vertical_speed"):.1f} m/s',
+            f'Altitude: {value("altitude"):.1f} m',
+            f'Fuel: {value("mass_fuel"):.0f} kg',
+        ]
+    #------------------------------------------------------------
+    def _draw(self, surface, position, altitude, pitch, gear_down, crashed, ground, indicators):
+        self.scene.draw(surface, position, altitude, pitch, gear_down, crashed, ground)
+
+        # Instrument panel
+        if indicators:
+            W = self.resolution[0]
+            line_height = self.font.get_linesize()
+            indicators = [self.font.render(indicator, 1, white) for indicator in indicators]
+            panel = pygame.Surface((0.02*W + max(indicator.get_width() for indicator in indicators), (len(indicators) + 1)*line_height))
+            panel.set_alpha(150)
+            panel.fill(grey)
+            surface.blit(panel, (0,0))
+            for n,indicator in enumerate(indicators):
+                surface.blit(indicator, (0.01*W, 0.5*line_height + n*line_height))
+#=========================================================================================================
@@ -0,0 +1,410 @@
+import os
+import json
+from collections import namedtuple
+from functools import lru_cache
+from math import inf
+import numpy as np
+from world import AIRPORTS, runway_at
+
+#=========================================================================================================
+# Directory containing the scenario files
+SCENARIOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+DEFAULT_SCENARIO = 'first-flight'
+
+# Types of objectives
+TAKEOFF, ALTITUDE, WAYPOINT, LAND = range(4)
+OBJECTIVE_TYPES = {'takeoff': TAKEOFF, 'altitude': ALTITUDE, 'waypoint': WAYPOINT, 'land': LAND}
+
+# Settings of every type of objective and their default values (None for required settings)
+OBJECTIVE_SETTINGS = {
+    TAKEOFF: {'altitude': 40},                                      # m
+    ALTITUDE: {'altitude': None},                                   # m
+    WAYPOINT: {'position': None, 'min_altitude': 0, 'max_altitude': inf}, # m
+    LAND: {'airport': 0, 'max_speed': 5},                           # -, m/s
+}
+# Settings shared by all objectives
+OBJECTIVE_LIMITS = {
+    'time_limit': inf,  # s since the start of the mission
+    'speed_limit': inf, # m/s of airspeed while the objective is active
+}
+
+# Status of a mission
+RUNNING, COMPLETED, FAILED = range(3)
+
+# Reasons for failing a mission
+CRASHED, OUTSIDE_RUNWAY, TIME_LIMIT, SPEED_LIMIT, MISSED_WAYPOINT = range(1, 6)
+FAILURES = {
+    CRASHED: 'The aircraft crashed',
+    OUTSIDE_RUNWAY: 'The aircraft landed outside of a runway',
+    TIME_LIMIT: 'The time limit has been exceeded',
+    SPEED_LIMIT: 'The speed limit has been exceeded',
+    MISSED_WAYPOINT: 'The aircraft missed a waypoint',
+}
+
+Objective = namedtuple('Objective', ['description', 'kind', 'target', 'low', 'high', 'time_limit', 'speed_limit'])
+Objective.__doc__ = """Compiled objective of a mission.
+
+The meaning of the target, low and high values depends on the kind of objective:
+    TAKEOFF: height above the ground to climb above
+    ALTITUDE: altitude to reach
+    WAYPOINT: position to cross, between the low and high altitudes
+    LAND: airport to stop on (0 for any airport but the start one), below the high ground speed
+"""
+
+Scenario = namedtuple('Scenario', ['name', 'start_airport', 'start_position', 'fuel', 'objectives'])
+Scenario.__doc__ = """Compiled mission: start conditions and ordered objectives.
+
+The fuel is None when the mission starts with full tanks.
+"""
+
+#=========================================================================================================
+def _setting(specifications, key, default, rng):
+    """Read a numerical setting. Settings given as [low, high, step] are drawn at random."""
+    value = specifications.get(key, default)
+    if value is None:
+        raise ValueError(f'Missing scenario setting "{key}"')
+    if isinstance(value, list):
+        if len(value) != 3 or value[2] <= 0 or value[1] < value[0]:
+            raise ValueError(f'Random scenario setting "{key}" must be given as [low, high, step], got {value!r}')
+        low, high, step = value
+        value = low + step*int(rng.integers(0, (high - low)//step + 1))
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f'Scenario setting "{key}" must be a number, got {value!r}')
+    return value
+#=========================================================================================================
+
+#=========================================================================================================
+def _describe(kind, target, low, high, time_limit, speed_limit):
+    """Text displayed for an objective."""
+    if kind == TAKEOFF:
+        description = 'Takeoff from the airport'
+    elif kind == ALTITUDE:
+        description = f'Reach an altitude of {target:.0f} m'
+    elif kind == WAYPOINT:
+        description = f'Cross {target/1000:.1f} km above {low:.0f} m'
+        if high < inf:
+            description = f'Cross {target/1000:.1f} km between {low:.0f} and {high:.0f} m'
+    else:
+        description = f'Land on airport {target:.0f}' if target else 'Land on an airport'
+    if speed_limit < inf:
+        description += f' below {speed_limit:.0f} m/s'
+    if time_limit < inf:
+        description += f' within {time_limit:.0f} s'
+    return description
+#=========================================================================================================
+
+#=========================================================================================================
+def compile_scenario(specifications, airports=AIRPORTS, seed=None):
+    """Validate the specifications of a mission and compile them into an immutable scenario.
+
+    A scenario time limit or speed limit applies to all objectives not setting their own.
+
+    Args:
+        specifications (dict): Specifications of the mission
+        airports (list): Positions of the airports in m
+        seed (int, optional): Seed for the settings drawn at random
+
+    Returns:
+        Scenario: Compiled scenario
+
+    Raises:
+        ValueError: If a setting is missing, unknown or outside of its range
+    """
+    rng = np.random.default_rng(seed)
+    unknown = [key for key in specifications if key not in ('name', 'start_airport', 'fuel', 'objectives', *OBJECTIVE_LIMITS)]
+    if unknown:
+        raise ValueError(f'Unknown scenario settings: {", ".join(unknown)}')
+    if not specifications.get('objectives'):
+        raise ValueError('A scenario needs at least one objective')
+
+    start_airport = specifications.get('start_airport', 1)
+    if start_airport not in range(1, len(airports) + 1):
+        raise ValueError(f'The start airport must be between 1 and {len(airports)}, got {start_airport!r}')
+    fuel = specifications.get('fuel')
+    if fuel is not None:
+        fuel = _setting(specifications, 'fuel', None, rng)
+    limits = {key: _setting(specifications, key, default, rng) for key,default in OBJECTIVE_LIMITS.items()}
+
+    objectives = []
+    for objective in specifications['objectives']:
+        kind = OBJECTIVE_TYPES.get(objective.get('type'))
+        if kind is None:
+            raise ValueError(f'Unknown objective type {objective.get("type")!r}. Available types: {", ".join(OBJECTIVE_TYPES)}')
+        settings = {**OBJECTIVE_SETTINGS[kind], **limits}
+        unknown = [key for key in objective if key not in settings and key not in ('type', 'description')]
+        if unknown:
+            raise ValueError(f'Unknown settings of the {objective["type"]} objective: {", ".join(unknown)}')
+        values = [_setting(objective, key, default, rng) for key,default in settings.items()]
+        if kind == LAND and values[0] not in range(len(airports) + 1):
+            raise ValueError(f'The landing airport must be between 1 and {len(airports)}, got {values[0]!r}')
+
+        # Order the values as target, low and high
+        if kind == WAYPOINT:
+            target, low, high = values[:3]
+        elif kind == LAND:
+            target, low, high = values[0], 0, values[1]
+        else:
+            target, low, high = values[0], 0, inf
+        time_limit, speed_limit = values[-2:]
+        description = objective.get('description') or _describe(kind, target, low, high, time_limit, speed_limit)
+        objectives.append(Objective(description, kind, target, low, high, time_limit, speed_limit))
+
+    return Scenario(
+        name = specifications.get('name', 'Custom mission'),
+        start_airport = start_airport,
+        start_position = airports[start_airport - 1],
+        fuel = fuel,
+        objectives = tuple(objectives),
+    )
+#=========================================================================================================
+
+#=========================================================================================================
+def available_scenarios():
+    """Names of the scenarios shipped with the simulator.
+
+    Returns:
+        list: Scenario names
+    """
+    return sorted(os.path.splitext(file)[0] for file in os.listdir(SCENARIOS_DIR) if file.endswith('.json'))
+#=========================================================================================================
+
+#=========================================================================================================
+@lru_cache(maxsize=None)
+def _read_scenario(path):
+    with open(path) as file:
+        return json.load(file)
+
+def load_scenario(scenario=DEFAULT_SCENARIO, airports=AIRPORTS, seed=None):
+    """Load and compile a scenario.
+
+    Files are read only once, but the settings drawn at random are drawn anew at every call.
+
+    Args:
+        scenario (str): Name of a scenario in the scenarios directory or path to a JSON scenario file
+        airports (list): Positions of the airports in m
+        seed (int, optional): Seed for the settings drawn at random
+
+    Returns:
+        Scenario: Compiled scenario
+    """
+    path = scenario if os.path.isfile(scenario) else os.path.join(SCENARIOS_DIR, f'{scenario}.json')
+    if not os.path.isfile(path):
+        raise ValueError(f'Unknown scenario "{scenario}". Available scenarios: {", ".join(available_scenarios())}')
+    return compile_scenario(_read_scenario(path), airports, seed)
+#=========================================================================================================
+
+
+class Mission(object):
+    """
+    Progress of a single aircraft through a scenario.
+
+    The objectives are evaluated in order as a state machine: at every step only the active
+    objective and its limits are checked, together with the rules of the game (crashing or
+    touching the ground outside of a runway fails the mission).
+
+    Attributes:
+        scenario : Scenario
+            Compiled scenario of the mission.
+        objective : int
+            Index of the active objective (number of completed objectives).
+        status : int
+            RUNNING, COMPLETED or FAILED.
+        failure : int
+            Reason for failing the mission (see FAILURES), 0 if not failed.
+        time : float
+            Time elapsed since the start of the mission in s.
+    """
+    def __init__(self, scenario, airports=AIRPORTS):
+        self.scenario = scenario
+        self.airports = airports
+        self.objective = 0
+        self.status = RUNNING
+        self.failure = 0
+        self.time = 0 # s
+
+    #------------------------------------------------------------
+    def start(self, aircraft):
+        """Put an aircraft at the start of the mission.
+
+        Args:
+            aircraft (Aircraft): Aircraft flying the mission
+        """
+        aircraft.position = self.scenario.start_position
+        if self.scenario.fuel is not None:
+            aircraft.mass_fuel = self.scenario.fuel
+        self.objective = 0
+        self.status = RUNNING
+        self.failure = 0
+        self.time = 0
+    #------------------------------------------------------------
+    def message(self):
+        """Text describing the outcome of the mission.
+
+        Returns:
+            str: Failure reason or success message, None while the mission is running
+        """
+        if self.status == FAILED:
+            return FAILURES[self.failure]
+        if self.status == COMPLETED:
+            if self.scenario.objectives[-1].kind == LAND:
+                return 'The aircraft has successfully landed'
+            return 'All objectives have been fulfilled'
+    #------------------------------------------------------------
+    def update(self, aircraft, Δt):
+        """Advance the mission by one time step.
+
+        Args:
+            aircraft (Aircraft): Aircraft flying the mission
+            Δt (float): Time step in s
+
+        Returns:
+            int: Status of the mission
+        """
+        if self.status != RUNNING:
+            return self.status
+        self.time += Δt
+        objective = self.scenario.objectives[self.objective]
+        runway = runway_at(aircraft.position, self.airports) if aircraft.altitude==aircraft.ground else -1
+
+        # Failures
+        if aircraft.crashed:
+            self.failure = CRASHED
+        elif runway==0:
+            self.failure = OUTSIDE_RUNWAY
+        elif self.time>objective.time_limit:
+            self.failure = TIME_LIMIT
+        elif objective.speed_limit<inf and aircraft.airspeed()>objective.speed_limit:
+            self.failure = SPEED_LIMIT
+        elif objective.kind==WAYPOINT and aircraft.position>=objective.target and not objective.low<=aircraft.altitude<=objective.high:
+            self.failure = MISSED_WAYPOINT
+        if self.failure:
+            self.status = FAILED
+            return self.status
+
+        # Completion of the active objective
+        kind = objective.kind
+        if kind == TAKEOFF:
+            done = aircraft.altitude - aircraft.ground>objective.target
+        elif kind == ALTITUDE:
+            done = aircraft.altitude>=objective.target
+        elif kind == WAYPOINT:
+            done = aircraft.position>=objective.target
+        else:
+            on_target = runway==objective.target if objective.target else runway!=self.scenario.start_airport
+            done = runway>0 and on_target and abs(aircraft.horizontal_speed)<objective.high
+        if done:
+            self.objective += 1
+            if self.objective == len(self.scenario.objectives):
+                self.status = COMPLETED
+        return self.status
+#=========================================================================================================
+
+
+class MissionBatch(object):
+    """
+    Progress of a fleet of aircraft through their scenarios, evaluated together.
+
+    Every aircraft flies its own scenario. The objectives of all scenarios are compiled into
+    padded tables, so that the active objective of every aircraft is gathered and evaluated in a
+    few array operations per step (see Mission for the rules).
+
+    Attributes:
+        scenarios : list
+            Compiled scenario of every aircraft.
+        objective : numpy.ndarray
+            Index of the active objective of every aircraft.
+        status : numpy.ndarray
+            Status of the mission of every aircraft.
+        failure : numpy.ndarray
+            Reason for failing the mission of every aircraft, 0 if not failed.
+        time : numpy.ndarray
+            Times elapsed since the start of the missions in s.
+    """
+    def __init__(self, scenarios, airports=AIRPORTS):
+        size = len(scenarios)
+        self.scenarios = list(scenarios)
+        self.airports = airports
+        self.size = size
+
+        # Tables of the objectives of shape (size, maximal number of objectives)
+        depth = max(len(scenario.objectives) for scenario in self.scenarios)
+        table = np.zeros((len(Objective._fields) - 1, size, depth))
+        for n,scenario in enumerate(self.scenarios):
+            table[:, n, :len(scenario.objectives)] = np.transpose([objective[1:] for objective in scenario.objectives])
+        kind, self.target, self.low, self.high, self.time_limit, self.speed_limit = table
+        self.kind = kind.astype(int)
+        self.length = np.array([len(scenario.objectives) for scenario in self.scenarios])
+        self.start_airport = np.array([scenario.start_airport for scenario in self.scenarios])
+        self.start_position = np.array([scenario.start_position for scenario in self.scenarios], dtype=float)
+        self.fuel = np.array([np.nan if scenario.fuel is None else scenario.fuel for scenario in self.scenarios])
+
+        self.objective = np.zeros(size, dtype=int)
+        self.status = np.full(size, RUNNING)
+        self.failure = np.zeros(size, dtype=int)
+        self.time = np.zeros(size) # s
+
+    #------------------------------------------------------------
+    def start(self, fleet, index=slice(None)):
+        """Put the selected aircraft of a fleet at the start of their missions.
+
+        Args:
+            fleet (Fleet): Aircraft flying the missions
+            index (int, slice or numpy.ndarray): Missions to start, all by default
+        """
+        fleet.position[index] = self.start_position[index]
+        fuel = self.fuel[index]
+        fleet.mass_fuel[index] = np.where(np.isnan(fuel), fleet.mass_fuel[index], fuel)
+        self.objective[index] = 0
+        self.status[index] = RUNNING
+        self.failure[index] = 0
+        self.time[index] = 0
+    #------------------------------------------------------------
+    def update(self, fleet, Δt):
+        """Advance the missions by one time step.
+
+        Args:
+            fleet (Fleet): Aircraft flying the missions
+            Δt (float): Time step in s
+
+        Returns:
+            numpy.ndarray: Status of the missions
+        """
+        running = self.status == RUNNING
+        self.time += Δt
+
+        # Gather the settings of the active objectives
+        rows = np.arange(self.size)
+        active = np.minimum(self.objective, self.length - 1)
+        kind = self.kind[rows, active]
+        target = self.target[rows, active]
+        low = self.low[rows, active]
+        high = self.high[rows, active]
+
+        # Failures
+        position, altitude = fleet.position, fleet.altitude
+        on_ground = altitude==fleet.ground
+        runway = runway_at(position, self.airports)
+        crossed = position>=target
+        failure = np.select(
+            [fleet.crashed, on_ground & (runway==0), self.time>self.time_limit[rows, active],
+             fleet.airspeed()>self.speed_limit[rows, active], (kind==WAYPOINT) & crossed & ((altitude<low) | (altitude>high))],
+            [CRASHED, OUTSIDE_RUNWAY, TIME_LIMIT, SPEED_LIMIT, MISSED_WAYPOINT],
+            0,
+        )
+        failed = running & (failure>0)
+        self.failure[failed] = failure[failed]
+        self.status[failed] = FAILED
+
+        # Completion of the active objectives
+        landed = on_ground & (runway>0) & (np.abs(fleet.horizontal_speed)<high)
+        landed &= np.where(target>0, runway==target, runway!=self.start_airport)
+        done = np.select(
+            [kind==TAKEOFF, kind==ALTITUDE, kind==WAYPOINT],
+            [altitude - fleet.ground>target, altitude>=target, crossed],
+            landed,
+        )
+        done &= running & ~failed
+        self.objective += done
+        self.status[done & (self.objective==self.length)] = COMPLETED
+        return self.status
+#=========================================================================================================
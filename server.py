@@ -0,0 +1,285 @@
+"""
+Local environment server.
+
+Hosts an EnvironmentPool in its own process and serves batched reset/step requests over a local
+Unix socket (named pipe on Windows). Actions, observations, rewards and episode terminations are
+exchanged through a ring buffer of slots in shared memory: the socket only carries a few bytes per
+request telling which slot to use.
+
+Usage:
+    with launch_server(size=256) as client:
+        observations = client.reset()
+        for _ in range(1000):
+            observations, rewards, dones = client.step(actions)
+
+Running this file benchmarks the server against stepping the pool in-process.
+"""
+import os
+import sys
+import time
+import struct
+import tempfile
+import multiprocessing
+from multiprocessing.connection import Listener, Client, arbitrary_address
+import numpy as np
+from aircraft import DEFAULT_PROFILE
+from environment import EnvironmentPool
+from world import Terrain
+from weather import WindField
+
+# Address family of the local socket
+FAMILY = 'AF_PIPE' if sys.platform == 'win32' else 'AF_UNIX'
+
+# Directory for the shared memory buffers (memory-backed file system if available)
+BUFFERS_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# Requests: command and ring buffer slot
+REQUEST = struct.Struct('<BI')
+RESET, STEP, CLOSE, SHUTDOWN = range(4)
+
+#=========================================================================================================
+def buffer_layout(size, slots):
+    """Layout of the shared memory ring buffer.
+
+    Args:
+        size (int): Number of environments
+        slots (int): Number of slots of the ring buffer
+
+    Returns:
+        tuple: Dictionary mapping every array to its (dtype, shape, offset) and total size in bytes
+    """
+    arrays = {
+        'actions': (np.float32, (slots, size, len(EnvironmentPool.ACTIONS))),
+        'observations': (np.float32, (slots, size, len(EnvironmentPool.OBSERVATIONS))),
+        'rewards': (np.float32, (slots, size)),
+        'dones': (np.bool_, (slots, size)),
+    }
+    layout, offset = {}, 0
+    for name,(dtype,shape) in arrays.items():
+        layout[name] = (np.dtype(dtype).str, shape, offset)
+        # Keep every array aligned to cache lines
+        offset += -(-int(np.prod(shape))*np.dtype(dtype).itemsize//64)*64
+    return layout, offset
+#=========================================================================================================
+
+#=========================================================================================================
+def map_buffers(path, layout, total, mode):
+    """Map the arrays of the shared memory ring buffer.
+
+    Args:
+        path (str): Path of the buffer file
+        layout (dict): Layout of the buffer (see buffer_layout)
+        total (int): Size of the buffer in bytes
+        mode (str): 'w+' to create the buffer, 'r+' to attach to an existing one
+
+    Returns:
+        dict: Arrays of the buffer
+    """
+    memory = np.memmap(path, dtype=np.uint8, mode=mode, shape=(total,))
+    return {name: np.ndarray(shape, dtype=dtype, buffer=memory, offset=offset) for name,(dtype,shape,offset) in layout.items()}
+#=========================================================================================================
+
+#=========================================================================================================
+def serve(address, size, profile=DEFAULT_PROFILE, Δt=1/60, max_steps=36000, slots=4, weather=None, scenarios=None, terrain=None):
+    """Run the environment server until a client requests its shutdown.
+
+    Clients are served one after another. Every connection gets a fresh pool of environments and
+    shared memory ring buffer, which are announced to the client when it connects.
+
+    Args:
+        address (str): Address of the local socket
+        size (int): Number of environments in the pool
+        profile (str): Aircraft profile
+        Δt (float): Simulation time step in s
+        max_steps (int): Maximal number of steps of an episode
+        slots (int): Number of slots of the ring buffer
+        weather (int, optional): Seed of the wind field, calm air if None
+        scenarios (list, optional): Compiled scenarios flown by the environments (see EnvironmentPool)
+        terrain (int, optional): Seed of the terrain, flat ground if None
+    """
+    wind = None if weather is None else WindField(seed=weather)
+    terrain = None if terrain is None else Terrain.generate(seed=terrain)
+    layout, total = buffer_layout(size, slots)
+    with Listener(address, FAMILY) as listener:
+        running = True
+        while running:
+            with listener.accept() as connection:
+                pool = EnvironmentPool(size, profile=profile, Δt=Δt, max_steps=max_steps, wind=wind, scenarios=scenarios, terrain=terrain)
+                path = os.path.join(BUFFERS_DIR, f'flight-simulator-{os.getpid()}-{time.monotonic_ns()}.buf')
+                buffers = map_buffers(path, layout, total, 'w+')
+                try:
+                    connection.send({'path': path, 'layout': layout, 'total': total, 'size': size, 'slots': slots,
+                                     'observations': EnvironmentPool.OBSERVATIONS, 'actions': EnvironmentPool.ACTIONS})
+                    while True:
+                        try:
+                            command, slot = REQUEST.unpack(connection.recv_bytes())
+                        except EOFError:
+                            break
+                        if command == STEP:
+                            pool.step(buffers['actions'][slot], buffers['observations'][slot], buffers['rewards'][slot], buffers['dones'][slot])
+                        elif command == RESET:
+                            pool.reset(observations=buffers['observations'][slot])
+                        else:
+                            running = command != SHUTDOWN
+                            break
+                        connection.send_bytes(REQUEST.pack(command, slot))
+                finally:
+                    del buffers
+                    os.remove(path)
+#=========================================================================================================
+
+
+class EnvironmentClient(object):
+    """
+    Client of an environment server.
+
+    The arrays returned by reset and step are views into the shared memory ring buffer. They stay
+    valid until the ring buffer wraps around, i.e. for the next `slots - 1` requests, and must be
+    copied to be kept longer.
+
+    Attributes:
+        size : int
+            Number of environments of the server.
+        slots : int
+            Number of slots of the ring buffer.
+        observations : tuple
+            Names of the observation columns.
+        actions : tuple
+            Names of the action columns.
+    """
+    def __init__(self, address):
+        self.connection = Client(address, FAMILY)
+        info = self.connection.recv()
+        self.size = info['size']
+        self.slots = info['slots']
+        self.observations = info['observations']
+        self.actions = info['actions']
+        self._buffers = map_buffers(info['path'], info['layout'], info['total'], 'r+')
+        self._slot = 0
+        self._server = None
+
+    #------------------------------------------------------------
+    def _request(self, command):
+        slot = self._slot
+        self._slot = (slot + 1) % self.slots
+        self.connection.send_bytes(REQUEST.pack(command, slot))
+        self.connection.recv_bytes()
+        return slot
+    #------------------------------------------------------------
+    def reset(self):
+        """Reset all environments.
+
+        Returns:
+            numpy.ndarray: Observations of shape (size, len(observations))
+        """
+        return self._buffers['observations'][self._request(RESET)]
+    #------------------------------------------------------------
+    def step(self, actions):
+        """Advance all environments by one time step.
+
+        Args:
+            actions (numpy.ndarray): Actions of shape (size, len(actions))
+
+        Returns:
+            tuple: Observations, rewards and episode terminations
+        """
+        self._buffers['actions'][self._slot] = actions
+        slot = self._request(STEP)
+        return self._buffers['observations'][slot], self._buffers['rewards'][slot], self._buffers['dones'][slot]
+    #------------------------------------------------------------
+    def close(self, shutdown=False):
+        """Disconnect from the server.
+
+        Args:
+            shutdown (bool): Whether to also stop the server
+        """
+        if self.connection.closed:
+            return
+        self.connection.send_bytes(REQUEST.pack(SHUTDOWN if shutdown else CLOSE, 0))
+        self.connection.close()
+        self._buffers = None
+        # Let a server started by launch_server release its buffers
+        if shutdown and self._server is not None:
+            self._server.join()
+    #------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close(shutdown=self._server is not None)
+#=========================================================================================================
+
+
+#=========================================================================================================
+def launch_server(size, profile=DEFAULT_PROFILE, Δt=1/60, max_steps=36000, slots=4, weather=None, scenarios=None, terrain=None, address=None, timeout=10):
+    """Start an environment server in a new process and connect to it.
+
+    The server is shut down when the returned client is used as a context manager and exits,
+    or when the client is closed with `shutdown=True`.
+
+    Args:
+        size (int): Number of environments in the pool
+        profile (str): Aircraft profile
+        Δt (float): Simulation time step in s
+        max_steps (int): Maximal number of steps of an episode
+        slots (int): Number of slots of the ring buffer
+        weather (int, optional): Seed of the wind field, calm air if None
+        scenarios (list, optional): Compiled scenarios flown by the environments (see EnvironmentPool)
+        terrain (int, optional): Seed of the terrain, flat ground if None
+        address (str, optional): Address of the local socket, a free address is chosen by default
+        timeout (float): Maximal time to wait for the server to start in s
+
+    Returns:
+        EnvironmentClient: Client connected to the new server
+    """
+    address = address or arbitrary_address(FAMILY)
+    process = multiprocessing.Process(target=serve, args=(address, size, profile, Δt, max_steps, slots, weather, scenarios, terrain), daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            client = EnvironmentClient(address)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            if not process.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f'The environment server at {address} did not start')
+            time.sleep(0.01)
+    client._server = process
+    return client
+#=========================================================================================================
+
+
+#=========================================================================================================
+def benchmark(sizes=(1, 16, 256, 4096), duration=2):
+    """Compare the throughput of the environment server with stepping the pool in-process.
+
+    Args:
+        sizes (tuple): Numbers of environments to benchmark
+        duration (float): Duration of every measurement in s
+    """
+    def throughput(step, size):
+        steps, start = 0, time.perf_counter()
+        while time.perf_counter() - start < duration:
+            step()
+            steps += 1
+        return steps*size/(time.perf_counter() - start)
+
+    print(f'{"Environments":>12} {"In-process":>16} {"Server":>16} {"Ratio":>8}')
+    for size in sizes:
+        actions = np.zeros((size, len(EnvironmentPool.ACTIONS)), dtype=np.float32)
+        actions[:,0] = 1
+
+        pool = EnvironmentPool(size)
+        pool.reset()
+        local = throughput(lambda: pool.step(actions), size)
+
+        with launch_server(size) as client:
+            client.reset()
+            remote = throughput(lambda: client.step(actions), size)
+
+        print(f'{size:>12} {local:>12.0f} st/s {remote:>12.0f} st/s {remote/local:>8.2f}')
+#=========================================================================================================
+
+
+if __name__ == '__main__':
+    benchmark()
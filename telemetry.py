@@ -0,0 +1,209 @@
+"""
+Live telemetry of a flight.
+
+A TelemetryPublisher samples the state of an aircraft at a fixed rate, detects the flight events
+(takeoff, landing, crash, completed objectives, end of the mission) and publishes both in batches
+to a local consumer, over UDP or a Unix datagram socket. The game loop only appends to bounded
+queues: a background thread encodes and sends the batches, and the oldest entries are dropped
+(and counted) when the consumer cannot keep up.
+
+Every datagram is a JSON object:
+    {"sequence": 12, "fields": [...], "samples": [[...], ...], "events": [{"time": ..., "event": ...}, ...],
+     "dropped_samples": 0, "dropped_events": 0}
+
+Usage:
+    telemetry = TelemetryPublisher(('127.0.0.1', 5005), rate=10)
+    telemetry.record(plane, mission)   # every frame
+    telemetry.close()
+
+Running this file prints the telemetry received on an address, e.g. python telemetry.py 127.0.0.1:5005
+"""
+import sys
+import json
+import time
+import socket
+import threading
+from collections import deque
+from world import runway_at, AIRPORTS
+
+# State of the aircraft in every sample
+FIELDS = ('time', 'position', 'altitude', 'ground', 'horizontal_speed', 'vertical_speed', 'pitch', 'angle_of_attack',
+          'thrust_level', 'flap_deflection', 'gear_down', 'spoilers', 'brakes', 'mass_fuel')
+
+# Largest number of samples per datagram (keeps datagrams well below the size limit of UDP)
+MAX_BATCH = 64
+
+
+class TelemetryPublisher(object):
+    """
+    Publisher of the telemetry of a single aircraft.
+
+    Attributes:
+        address : tuple or str
+            Host and port of a UDP consumer, or path of a Unix datagram socket.
+        rate : float
+            Samples per second of simulated time.
+        interval : float
+            Time between two publications in s.
+        dropped_samples : int
+            Samples dropped because the queue was full.
+        dropped_events : int
+            Events dropped because the queue was full.
+        send_errors : int
+            Datagrams that could not be sent, e.g. while no consumer is listening on a Unix socket or
+            while its receive buffer is full.
+    """
+    def __init__(self, address, rate=10, interval=0.2, queue_size=1024, airports=AIRPORTS):
+        self.address = address
+        self.rate = rate
+        self.interval = interval
+        self.airports = airports
+        self.samples = deque()
+        self.events = deque()
+        self.queue_size = queue_size
+        self.dropped_samples = 0
+        self.dropped_events = 0
+        self.send_errors = 0
+        self.sequence = 0
+
+        # State of the previous record for the detection of events
+        self._next_sample = 0
+        self._on_ground = None
+        self._crashed = False
+        self._objective = 0
+        self._status = None
+
+        family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+        self.socket = socket.socket(family, socket.SOCK_DGRAM)
+        # A consumer falling behind must not stall the sender (Unix datagram sockets block when full)
+        self.socket.setblocking(False)
+        # Guards the queues and their drop counters, shared by the game loop and the sender
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._send_loop, name='telemetry', daemon=True)
+        self._thread.start()
+
+    #------------------------------------------------------------
+    def _put(self, queue, entry, counter):
+        """Append to a queue, dropping its oldest entry if full and counting it in the given attribute."""
+        with self._lock:
+            if len(queue) >= self.queue_size:
+                queue.popleft()
+                setattr(self, counter, getattr(self, counter) + 1)
+            queue.append(entry)
+    #------------------------------------------------------------
+    def event(self, name, time, **details):
+        """Queue a flight event.
+
+        Args:
+            name (str): Name of the event
+            time (float): Simulated time in s
+            details: Additional values of the event
+        """
+        self._put(self.events, {'time': time, 'event': name, **details}, 'dropped_events')
+    #------------------------------------------------------------
+    def record(self, aircraft, mission=None):
+        """Sample the aircraft if due and queue the events since the previous record.
+
+        Meant to be called after every simulation step.
+
+        Args:
+            aircraft (Aircraft): Aircraft to follow
+            mission (Mission, optional): Mission flown by the aircraft
+        """
+        now = aircraft.time
+        if now >= self._next_sample:
+            self._next_sample = max(self._next_sample + 1/self.rate, now)
+            sample = [getattr(aircraft, name) for name in FIELDS]
+            self._put(self.samples, [float(value) for value in sample], 'dropped_samples')
+
+        on_ground = aircraft.altitude==aircraft.ground
+        if self._on_ground is not None and on_ground != self._on_ground and not aircraft.crashed:
+            airport = int(runway_at(aircraft.position, self.airports))
+            if on_ground:
+                self.event('landing', now, position=aircraft.position, airport=airport)
+            else:
+                self.event('takeoff', now, position=aircraft.position, airport=airport)
+        self._on_ground = on_ground
+        if aircraft.crashed and not self._crashed:
+            self.event('crash', now, position=aircraft.position, altitude=aircraft.altitude)
+        self._crashed = aircraft.crashed
+
+        if mission is not None:
+            for n in range(self._objective, mission.objective):
+                self.event('objective', now, objective=n, description=mission.scenario.objectives[n].description)
+            self._objective = mission.objective
+            if mission.status != self._status and self._status is not None:
+                self.event('mission', now, status=mission.status, message=mission.message())
+            self._status = mission.status
+    #------------------------------------------------------------
+    def _batch(self):
+        """Encode the queued samples and events into a datagram, None if there is nothing to send."""
+        with self._lock:
+            samples = [self.samples.popleft() for _ in range(min(len(self.samples), MAX_BATCH))]
+            events = [self.events.popleft() for _ in range(min(len(self.events), MAX_BATCH))]
+            dropped_samples, dropped_events = self.dropped_samples, self.dropped_events
+        if not samples and not events:
+            return None
+        self.sequence += 1
+        return json.dumps({'sequence': self.sequence, 'fields': FIELDS, 'samples': samples, 'events': events,
+                           'dropped_samples': dropped_samples, 'dropped_events': dropped_events}).encode()
+
+    def _send_loop(self):
+        while True:
+            stopping = self._stop.wait(self.interval)
+            while (datagram := self._batch()) is not None:
+                try:
+                    self.socket.sendto(datagram, self.address)
+                except OSError:
+                    self.send_errors += 1
+            if stopping:
+                return
+    #------------------------------------------------------------
+    def close(self):
+        """Publish the remaining telemetry and stop the sender."""
+        self._stop.set()
+        self._thread.join()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+#=========================================================================================================
+
+
+#=========================================================================================================
+def parse_address(text):
+    """Address of a consumer from its text, 'host:port' for UDP or the path of a Unix socket.
+
+    Args:
+        text (str): Address
+
+    Returns:
+        tuple or str: Address for TelemetryPublisher
+    """
+    host, separator, port = text.rpartition(':')
+    if separator and port.isdigit():
+        return host, int(port)
+    return text
+#=========================================================================================================
+
+
+if __name__ == '__main__':
+    # Print the telemetry received on an address
+    address = parse_address(sys.argv[1] if len(sys.argv) > 1 else '127.0.0.1:5005')
+    receiver = socket.socket(socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX, socket.SOCK_DGRAM)
+    receiver.bind(address)
+    print(f'Listening on {address}')
+    while True:
+        message = json.loads(receiver.recv(1 << 16))
+        for event in message['events']:
+            print(f"{time.strftime('%H:%M:%S')} {event['time']:8.1f} s  {event['event']}: "
+                  + ', '.join(f'{key}={value}' for key,value in event.items() if key not in ('time', 'event')))
+        if message['samples']:
+            state = dict(zip(message['fields'], message['samples'][-1]))
+            print(f"{time.strftime('%H:%M:%S')} {state['time']:8.1f} s  position {state['position']:.0f} m, "
+                  f"altitude {state['altitude']:.0f} m, speed {state['horizontal_speed']:.1f} m/s "
+                  f"({len(message['samples'])} samples, {message['dropped_samples']} dropped)")
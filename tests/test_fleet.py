@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from aircraft import Aircraft
+from fleet import Fleet
+from traffic import Traffic
+from weather import WindField
+from world import AIRPORTS, Terrain
+from environment import EnvironmentPool, apply_actions
+from controllers import apply
+
+STATE = ('position', 'altitude', 'horizontal_speed', 'vertical_speed', 'pitch', 'angle_of_attack', 'thrust_level',
+         'flap_deflection', 'gear_down', 'spoilers', 'brakes', 'mass_fuel', 'crashed', 'ground')
+
+
+#=========================================================================================================
+@pytest.mark.parametrize('weather', [False, True])
+def test_fleet_matches_single_aircraft(weather):
+    # Piecewise constant random controls: take off, climb, manoeuvre and come back down
+    size, Δt = 8, 1/20
+    rng = np.random.default_rng(1)
+    fleet = Fleet(size)
+    aircraft = [Aircraft() for _ in range(size)]
+    if weather:
+        fleet.wind = WindField(seed=3)
+        fleet.terrain = Terrain.generate(seed=4)
+        for plane in aircraft:
+            plane.wind, plane.terrain = fleet.wind, fleet.terrain
+
+    for step in range(3000):
+        if step % 100 == 0:
+            actions = np.column_stack([
+                rng.uniform(0.3, 1, size), rng.uniform(-3, 12, size), rng.uniform(0, 30, size),
+                rng.random(size) > 0.5, rng.random(size) > 0.9, rng.random(size) > 0.9,
+            ])
+        apply_actions(fleet, actions)
+        fleet.step(Δt)
+        for plane,action in zip(aircraft, actions):
+            apply(plane, action)
+            plane.step(Δt)
+
+    for name in STATE:
+        expected = [getattr(plane, name) for plane in aircraft]
+        assert getattr(fleet, name) == pytest.approx(expected, rel=1e-6, abs=1e-6), name
+#=========================================================================================================
+
+#=========================================================================================================
+def test_pool_applies_the_limits_of_the_controls():
+    pool = EnvironmentPool(3, seed=0)
+    pool.reset()
+    actions = np.array([
+        [-1, 30, 80, 0, 1, 1],  # on the ground: reverse thrust, the gear stays down
+        [2, -30, -5, 1, 0, 0],
+        [0.5, 5, 20, 0, 0, 0],
+    ], dtype=float)
+    pool.apply(actions)
+    fleet = pool.fleet
+    assert fleet.thrust_level.tolist() == [-1, 1, 0.5]
+    assert fleet.pitch.tolist() == [EnvironmentPool.pitch_limits[1], EnvironmentPool.pitch_limits[0], 5]
+    assert fleet.flap_deflection.tolist() == [EnvironmentPool.flap_limits[1], EnvironmentPool.flap_limits[0], 20]
+    assert fleet.gear_down.all()
+    assert fleet.spoilers.tolist() == [True, False, False]
+#=========================================================================================================
+
+#=========================================================================================================
+def test_traffic_flies_between_the_airports():
+    traffic = Traffic(32, AIRPORTS, seed=0)
+    for _ in range(10*60*5):
+        traffic.step(1/5)
+    fleet = traffic.fleet
+    assert not fleet.crashed.any()
+    assert (fleet.altitude > fleet.ground).sum() > 16
+#=========================================================================================================
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from aircraft import Aircraft
+from fleet import Fleet
+from linearization import linearize, linearize_batch, state_derivative, finite_differences, STATES, VARIABLES
+
+
+#=========================================================================================================
+def random_aircraft(rng):
+    aircraft = Aircraft()
+    aircraft.horizontal_speed = rng.uniform(40, 300)
+    aircraft.vertical_speed = rng.uniform(-30, 30)
+    aircraft.altitude = rng.uniform(10, 12000)
+    aircraft.pitch = rng.uniform(-10, 25)
+    aircraft.thrust_level = rng.uniform(0, 1)
+    aircraft.flap_deflection = rng.uniform(0, 50)
+    aircraft.mass_fuel = rng.uniform(0, aircraft.profile.mass_fuel)
+    aircraft.gear_down, aircraft.spoilers = rng.integers(0, 2, 2).astype(bool)
+    aircraft.wind_horizontal, aircraft.wind_vertical = rng.normal(0, 10), rng.normal(0, 2)
+    return aircraft
+#=========================================================================================================
+
+#=========================================================================================================
+def test_jacobian_matches_finite_differences():
+    rng = np.random.default_rng(0)
+    errors = []
+    for _ in range(300):
+        aircraft = random_aircraft(rng)
+        derivative, jacobian = linearize(aircraft)
+        assert derivative == pytest.approx(state_derivative(aircraft), rel=1e-12, abs=1e-12)
+        reference = finite_differences(aircraft)
+        # Relative errors, down to a thousandth of the largest derivative of each state
+        scale = np.maximum(np.abs(reference), 1e-3*np.abs(reference).max(axis=1, keepdims=True) + 1e-12)
+        errors.append(np.max(np.abs(jacobian - reference)/scale))
+    assert np.median(errors) < 1e-7
+    assert np.max(errors) < 1e-5
+#=========================================================================================================
+
+#=========================================================================================================
+def test_batch_matches_single_aircraft():
+    rng = np.random.default_rng(1)
+    aircraft = [random_aircraft(rng) for _ in range(20)]
+    fleet = Fleet(len(aircraft))
+    for n,plane in enumerate(aircraft):
+        for name in ('horizontal_speed', 'vertical_speed', 'altitude', 'pitch', 'thrust_level', 'flap_deflection',
+                     'mass_fuel', 'gear_down', 'spoilers'):
+            getattr(fleet, name)[n] = getattr(plane, name)
+    fleet.wind_horizontal = np.array([plane.wind_horizontal for plane in aircraft])
+    fleet.wind_vertical = np.array([plane.wind_vertical for plane in aircraft])
+
+    derivatives, jacobians = linearize_batch(fleet)
+    assert derivatives.shape == (fleet.size, len(STATES))
+    assert jacobians.shape == (fleet.size, len(STATES), len(VARIABLES))
+    for n,plane in enumerate(aircraft):
+        derivative, jacobian = linearize(plane)
+        np.testing.assert_allclose(derivatives[n], derivative, rtol=1e-12)
+        np.testing.assert_allclose(jacobians[n], jacobian, rtol=1e-12)
+#=========================================================================================================
+
+#=========================================================================================================
+@pytest.mark.parametrize('speed, wind', [(0, 5), (0, -20), (3, 5), (-3, 0)])
+def test_ground_roll(speed, wind):
+    aircraft = Aircraft()
+    aircraft.horizontal_speed = speed
+    aircraft.wind_horizontal = wind
+    derivative, jacobian = linearize(aircraft)
+    assert derivative == pytest.approx(state_derivative(aircraft), rel=1e-12, abs=1e-12)
+    if speed == 0:
+        # Held by the static friction
+        assert derivative[2] == 0 and not jacobian[2].any()
+#=========================================================================================================
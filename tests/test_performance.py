@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from performance import load_performance
+
+
+#=========================================================================================================
+@pytest.fixture(scope='module')
+def performance():
+    return load_performance()
+#=========================================================================================================
+
+#=========================================================================================================
+def check_scalar_matches_batch(performance, mass, altitude, thrust_level):
+    speed, pitch = np.array([performance.cruise(*state) for state in zip(mass, altitude, thrust_level)]).T
+    np.testing.assert_allclose(speed, performance.interpolate_batch(performance.speed, mass, altitude, thrust_level), rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(pitch, performance.interpolate_batch(performance.pitch, mass, altitude, thrust_level), rtol=1e-12, equal_nan=True)
+    mass_fuel = mass - performance.masses[0]
+    ranges = [performance.cruise_range(*state) for state in zip(mass, mass_fuel, altitude, thrust_level)]
+    np.testing.assert_allclose(ranges, performance.cruise_range_batch(mass, mass_fuel, altitude, thrust_level), rtol=1e-12, equal_nan=True)
+#=========================================================================================================
+
+#=========================================================================================================
+def test_scalar_matches_batch_on_the_grid(performance):
+    mass, altitude, thrust_level = [axis.ravel() for axis in np.meshgrid(performance.masses, performance.altitudes,
+                                                                           performance.thrust_levels, indexing='ij')]
+    check_scalar_matches_batch(performance, mass, altitude, thrust_level)
+    # Steady cruises exist up to the edges of the grid
+    assert np.isfinite(performance.cruise_range(performance.masses[-1], performance.masses[-1] - performance.masses[0],
+                                                9000, performance.thrust_levels[-1]))
+#=========================================================================================================
+
+#=========================================================================================================
+def test_scalar_matches_batch_between_the_grid_points(performance):
+    rng = np.random.default_rng(0)
+    axes = (performance.masses, performance.altitudes, performance.thrust_levels)
+    mass, altitude, thrust_level = [rng.uniform(axis[0], axis[-1], 500) for axis in axes]
+    check_scalar_matches_batch(performance, mass, altitude, thrust_level)
+    # On the faces of the grid, one variable at its bound
+    for n,axis in enumerate(axes):
+        for bound in (axis[0], axis[-1]):
+            state = [mass, altitude, thrust_level]
+            state[n] = np.full(mass.size, bound)
+            check_scalar_matches_batch(performance, *state)
+#=========================================================================================================
+
+#=========================================================================================================
+def test_outside_of_the_grid(performance):
+    assert np.isnan(performance.cruise(performance.masses[-1] + 1, 1000, 0.5)).all()
+    assert np.isnan(performance.interpolate_batch(performance.speed, performance.masses[0], -1, 0.5))
+#=========================================================================================================
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from aircraft import Aircraft
+from fleet import Fleet
+
+
+#=========================================================================================================
+@pytest.mark.parametrize('speed, wind', [(0, 5), (0, -5), (100, 30), (100, -30), (100, 150)])
+def test_drag_opposes_airspeed(speed, wind):
+    # Drag alone: no thrust, lift or friction
+    aircraft = Aircraft()
+    aircraft.altitude = 1000
+    aircraft.horizontal_speed = speed
+    aircraft.wind_horizontal = wind
+    fleet = Fleet(1)
+    fleet.altitude[:] = 1000
+    fleet.horizontal_speed[:] = speed
+    fleet.wind_horizontal = np.full(1, float(wind))
+
+    expected = np.sign(wind - speed)
+    assert np.sign(aircraft.forces()[0]) == expected
+    assert np.sign(fleet.forces()[0][0]) == expected
+    assert fleet.forces()[0][0] == pytest.approx(aircraft.forces()[0])
+#=========================================================================================================
+
+#=========================================================================================================
+@pytest.mark.parametrize('wind', [5, -5, 20, -20])
+def test_parked_aircraft_holds_still_in_the_wind(wind):
+    aircraft = Aircraft()
+    aircraft.wind_horizontal = wind
+    fleet = Fleet(1)
+    fleet.wind_horizontal = np.full(1, float(wind))
+    for _ in range(600):
+        aircraft.step(1/60)
+        fleet.step(1/60)
+    assert aircraft.position == 0 and aircraft.horizontal_speed == 0
+    assert fleet.position[0] == 0 and fleet.horizontal_speed[0] == 0
+#=========================================================================================================
+
+#=========================================================================================================
+@pytest.mark.parametrize('speed', [5, -5])
+def test_wheel_friction_stops_the_rolling_aircraft(speed):
+    aircraft = Aircraft()
+    aircraft.horizontal_speed = speed
+    fleet = Fleet(1)
+    fleet.horizontal_speed[:] = speed
+    assert np.sign(aircraft.forces()[0]) == np.sign(fleet.forces()[0][0]) == -np.sign(speed)
+    for _ in range(400):
+        aircraft.step(0.1)
+        fleet.step(0.1)
+    # Stopped without reversing the motion
+    assert aircraft.horizontal_speed == 0 and np.sign(aircraft.position) == np.sign(speed)
+    assert fleet.horizontal_speed[0] == 0 and fleet.position[0] == pytest.approx(aircraft.position)
+#=========================================================================================================
+
+#=========================================================================================================
+@pytest.mark.parametrize('Δt', [1/60, 0.1, 0.5, 0.7, 1, 2])
+def test_parked_aircraft_rests_on_the_ground(Δt):
+    aircraft = Aircraft()
+    fleet = Fleet(2)
+    for _ in range(round(20/Δt)):
+        aircraft.step(Δt)
+        fleet.step(Δt)
+    assert not aircraft.crashed and aircraft.altitude == aircraft.ground
+    assert not fleet.crashed.any() and np.all(fleet.altitude == fleet.ground)
+#=========================================================================================================
+
+#=========================================================================================================
+@pytest.mark.parametrize('Δt', [1/60, 0.1, 0.5, 1])
+def test_hard_touchdown_crashes(Δt):
+    aircraft = Aircraft()
+    aircraft.altitude = 10
+    aircraft.horizontal_speed = 80
+    aircraft.vertical_speed = -10
+    fleet = Fleet(1)
+    fleet.altitude[:] = 10
+    fleet.horizontal_speed[:] = 80
+    fleet.vertical_speed[:] = -10
+    for _ in range(round(5/Δt)):
+        aircraft.step(Δt)
+        fleet.step(Δt)
+    assert aircraft.crashed
+    assert fleet.crashed.all()
+#=========================================================================================================
+
+#=========================================================================================================
+def test_touchdown_threshold_hardly_depends_on_the_time_step():
+    # Touchdowns at landing speed from 1 m above the ground, over a range of sink rates
+    sink_rates = np.linspace(-6, -3.5, 401)
+    thresholds = []
+    for Δt in [1/600, 1/60, 0.1, 0.25, 0.5, 1]:
+        fleet = Fleet(sink_rates.size)
+        fleet.altitude[:] = 1
+        fleet.horizontal_speed[:] = 70
+        fleet.vertical_speed[:] = sink_rates
+        for _ in range(round(3/Δt)):
+            fleet.step(Δt)
+        # Only the hardest touchdowns crash
+        assert fleet.crashed.any() and not fleet.crashed.all()
+        assert np.all(np.diff(fleet.crashed.astype(int))<=0)
+        thresholds.append(sink_rates[fleet.crashed].max())
+    # The forces are held over each step: the threshold stays within 0.075 m/s of the finest step
+    assert np.all(np.abs(np.subtract(thresholds, thresholds[0]))<0.075)
+#=========================================================================================================
@@ -0,0 +1,50 @@
+import pytest
+from aircraft import available_profiles, load_profile, compile_profile, PROFILE_SPECIFICATIONS
+
+
+def specifications():
+    """Specifications of the default profile, as read from its file."""
+    profile = load_profile()
+    return {key: getattr(profile, key) for key in PROFILE_SPECIFICATIONS}
+
+
+#=========================================================================================================
+@pytest.mark.parametrize('name', available_profiles())
+def test_shipped_profiles_load(name):
+    profile = load_profile(name)
+    assert profile.max_thrust == profile.engines*profile.engine_thrust
+#=========================================================================================================
+
+#=========================================================================================================
+@pytest.mark.parametrize('key, value', [
+    ('engines', 1.5),
+    ('engines', 0),
+    ('engines', -2),
+    ('engines', '2'),
+    ('engines', True),
+    ('friction_coefficient', -0.1),
+    ('mass_fuel', 0),
+    ('critic_match', 1.2),
+    ('max_match', 0.5),
+])
+def test_invalid_specifications_are_rejected(key, value):
+    invalid = {**specifications(), key: value}
+    with pytest.raises(ValueError):
+        compile_profile(invalid)
+#=========================================================================================================
+
+#=========================================================================================================
+def test_missing_and_unknown_specifications_are_rejected():
+    missing = specifications()
+    del missing['engines']
+    with pytest.raises(ValueError, match='Missing'):
+        compile_profile(missing)
+    with pytest.raises(ValueError, match='Unknown'):
+        compile_profile({**specifications(), 'wingspan': 34})
+#=========================================================================================================
+
+#=========================================================================================================
+def test_valid_specifications_compile():
+    assert compile_profile({**specifications(), 'friction_coefficient': 0}).friction_coefficient == 0
+    assert compile_profile({**specifications(), 'engines': 4.0}).max_thrust == 4*load_profile().engine_thrust
+#=========================================================================================================
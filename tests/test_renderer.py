@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from aircraft import Aircraft
+from fleet import Fleet
+from renderer import OffscreenRenderer
+
+
+#=========================================================================================================
+@pytest.mark.parametrize('hud', [False, True])
+def test_batch_matches_single_renders(hud):
+    fleet = Fleet(size=3)
+    fleet.position[:] = [1000, 5000, 20000]
+    fleet.altitude[:] = [0, 300, 2000]
+    fleet.pitch[:] = [0, 5, -3]
+    fleet.gear_down[:] = [True, True, False]
+    renderer = OffscreenRenderer(batch=3, hud=hud)
+    frames = renderer.render_batch(fleet).copy()
+    assert frames.shape == (3, 120, 160, 3)
+
+    for n in range(fleet.size):
+        plane = Aircraft()
+        plane.position, plane.altitude = fleet.position[n], fleet.altitude[n]
+        plane.pitch, plane.gear_down = fleet.pitch[n], fleet.gear_down[n]
+        assert np.array_equal(renderer.render(plane), frames[n])
+    # The aircraft are in different places of the world
+    assert not np.array_equal(frames[0], frames[2])
+#=========================================================================================================
+
+#=========================================================================================================
+def test_batch_too_small_for_the_fleet():
+    with pytest.raises(ValueError):
+        OffscreenRenderer(batch=2).render_batch(Fleet(size=3))
+#=========================================================================================================
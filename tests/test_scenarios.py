@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from aircraft import Aircraft
+from fleet import Fleet
+from weather import WindField
+from scenario import Mission, MissionBatch, available_scenarios, load_scenario, RUNNING
+
+
+#=========================================================================================================
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('name', available_scenarios())
+def test_parked_aircraft_survives_the_start(name, seed):
+    # The aircraft waits at the start of the mission, without thrust, in gusty wind
+    wind = WindField(seed=seed)
+    aircraft = Aircraft()
+    aircraft.wind = wind
+    mission = Mission(load_scenario(name, seed=seed))
+    mission.start(aircraft)
+    missions = MissionBatch([load_scenario(name, seed=seed)]*4)
+    fleet = Fleet(4)
+    fleet.wind = wind
+    missions.start(fleet)
+    for _ in range(300):
+        aircraft.step(1/60)
+        mission.update(aircraft, 1/60)
+        fleet.step(1/60)
+        missions.update(fleet, 1/60)
+        assert mission.status == RUNNING, mission.message()
+        assert np.all(missions.status == RUNNING)
+#=========================================================================================================
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import numpy as np
+from environment import EnvironmentPool
+from server import buffer_layout, map_buffers, launch_server
+
+
+#=========================================================================================================
+def test_buffers_round_trip():
+    layout, total = buffer_layout(size=5, slots=3)
+    assert all(offset % 64 == 0 for _,_,offset in layout.values())
+    path = os.path.join(tempfile.mkdtemp(), 'buffers')
+    writer = map_buffers(path, layout, total, 'w+')
+    reader = map_buffers(path, layout, total, 'r+')
+    rng = np.random.default_rng(0)
+    for name,array in writer.items():
+        array[...] = rng.random(array.shape) > 0.5 if array.dtype == bool else rng.random(array.shape)
+    for name,array in reader.items():
+        assert np.array_equal(array, writer[name]), name
+#=========================================================================================================
+
+#=========================================================================================================
+def test_server_matches_in_process_pool():
+    size, slots = 4, 3
+    # Full thrust, random pitch and the gear down; calm air keeps both pools deterministic
+    rng = np.random.default_rng(0)
+    actions = np.zeros((200, size, len(EnvironmentPool.ACTIONS)), dtype=np.float32)
+    actions[...,0] = rng.uniform(0.5, 1, (200, size))
+    actions[...,1] = rng.uniform(0, 10, (200, size))
+    actions[...,3] = 1
+
+    pool = EnvironmentPool(size)
+    expected = [pool.reset().astype(np.float32)]
+    for action in actions:
+        observations, rewards, dones = pool.step(action)
+        expected.append(observations.astype(np.float32))
+
+    with launch_server(size, slots=slots) as client:
+        assert client.size == size and client.slots == slots
+        received = [client.reset().copy()]
+        views = []
+        for action in actions:
+            observations, rewards, dones = client.step(action)
+            received.append(observations.copy())
+            views.append(observations)
+            # The views stay valid for the next slots - 1 requests
+            if len(views) >= slots:
+                assert np.array_equal(views[-slots], received[-slots])
+    assert np.array_equal(np.array(received), np.array(expected))
+#=========================================================================================================
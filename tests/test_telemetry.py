@@ -0,0 +1,104 @@
+import json
+import socket
+import threading
+import pytest
+from aircraft import Aircraft
+from controllers import Autopilot
+from scenario import Mission, load_scenario, RUNNING, COMPLETED
+from telemetry import TelemetryPublisher, FIELDS
+from world import AIRPORTS
+
+
+#=========================================================================================================
+class Receiver(threading.Thread):
+    """Consumer collecting the datagrams on a local UDP port while the publisher runs."""
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.settimeout(0.2)
+        self.address = self.socket.getsockname()
+        self.messages = []
+        self._stopping = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                self.messages.append(json.loads(self.socket.recv(1 << 16)))
+            except socket.timeout:
+                if self._stopping.is_set():
+                    return
+
+    def stop(self):
+        """Receive the remaining datagrams and return all messages."""
+        self._stopping.set()
+        self.join()
+        self.socket.close()
+        return self.messages
+#=========================================================================================================
+
+#=========================================================================================================
+@pytest.fixture
+def receiver():
+    receiver = Receiver()
+    receiver.start()
+    yield receiver
+    if receiver.is_alive():
+        receiver.stop()
+#=========================================================================================================
+
+#=========================================================================================================
+def fly(telemetry, Δt=0.1):
+    # First flight, to the sixth airport, flown by the autopilot
+    aircraft = Aircraft()
+    mission = Mission(load_scenario('first-flight', seed=0))
+    mission.start(aircraft)
+    autopilot = Autopilot(AIRPORTS[5], cruise_altitude=2800)
+    while mission.status == RUNNING and aircraft.time < 1200:
+        autopilot.control(aircraft, Δt)
+        aircraft.step(Δt)
+        mission.update(aircraft, Δt)
+        telemetry.record(aircraft, mission)
+    return aircraft, mission
+#=========================================================================================================
+
+#=========================================================================================================
+def test_flight_is_published(receiver):
+    with TelemetryPublisher(receiver.address, rate=10, interval=0.05, queue_size=100000) as telemetry:
+        aircraft, mission = fly(telemetry)
+    assert mission.status == COMPLETED
+    messages = receiver.stop()
+
+    assert [message['sequence'] for message in messages] == list(range(1, len(messages) + 1))
+    samples = [sample for message in messages for sample in message['samples']]
+    assert all(message['fields'] == list(FIELDS) for message in messages)
+    assert len(samples) == pytest.approx(10*aircraft.time, abs=2)
+    times = [sample[FIELDS.index('time')] for sample in samples]
+    assert times == sorted(times)
+    assert max(sample[FIELDS.index('altitude')] for sample in samples) > 1000
+
+    events = [event for message in messages for event in message['events']]
+    assert [event['event'] for event in events] == ['takeoff', 'objective', 'objective', 'landing', 'objective', 'mission']
+    assert events[0]['airport'] == 1 and events[3]['airport'] == 6
+    assert [event['objective'] for event in events if event['event'] == 'objective'] == [0, 1, 2]
+    assert events[-1]['status'] == COMPLETED and events[-1]['message'] == mission.message()
+    assert telemetry.dropped_samples == telemetry.dropped_events == telemetry.send_errors == 0
+#=========================================================================================================
+
+#=========================================================================================================
+def test_full_queue_drops_the_oldest_samples(receiver):
+    # The sender only runs once the publisher is closed
+    with TelemetryPublisher(receiver.address, rate=10, interval=3600, queue_size=16) as telemetry:
+        aircraft = Aircraft()
+        for _ in range(100):
+            aircraft.step(0.1)
+            telemetry.record(aircraft)
+    messages = receiver.stop()
+
+    samples = [sample for message in messages for sample in message['samples']]
+    assert len(samples) == 16
+    assert telemetry.dropped_samples == 100 - 16
+    assert messages[-1]['dropped_samples'] == telemetry.dropped_samples
+    # The most recent samples are kept
+    assert samples[-1][FIELDS.index('time')] == pytest.approx(aircraft.time)
+#=========================================================================================================
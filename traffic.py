@@ -0,0 +1,165 @@
+import numpy as np
+from aircraft import DEFAULT_PROFILE
+from fleet import Fleet
+
+
+class Traffic(object):
+    """
+    AI traffic flying between airports on simple autopilot schedules.
+
+    Every aircraft flies a leg from an origin airport to a destination airport further down the
+    route: it takes off, climbs to its cruise altitude, cruises and descends towards the destination
+    until it reaches the pattern altitude above its runway. The aircraft is then handed over to the
+    airport and departs again on a new leg. All aircraft are stepped together by a single Fleet.
+
+    Attributes:
+        fleet : Fleet
+            Flight physics of the traffic.
+        airports : numpy.ndarray
+            Positions of the airports in m.
+        origin : numpy.ndarray
+            Index of the airport each aircraft departed from.
+        destination : numpy.ndarray
+            Index of the airport each aircraft is flying to.
+        cruise_altitude : numpy.ndarray
+            Cruise altitude of each aircraft in m.
+        cruise_speed : numpy.ndarray
+            Cruise speed of each aircraft in m/s.
+    """
+    # Autopilot settings
+    rotation_speed = 75 # m/s
+    rotation_pitch = 8 # deg
+    takeoff_flaps = 15 # deg
+    approach_flaps = 25 # deg
+    flaps_retraction_altitude = 300 # m
+    gear_retraction_altitude = 50 # m
+    pattern_altitude = 300 # m
+    terrain_clearance = 300 # m
+    approach_speed = 110 # m/s
+    approach_distance = 10000 # m
+    descent_gradient = 0.05
+    max_climb_rate = 12 # m/s
+    max_descent_rate = 8 # m/s
+    altitude_gain = 0.05 # 1/s
+    pitch_gain = 0.4 # deg/m
+    thrust_gain = 0.05 # s/m
+    pitch_limits = (-5, 10) # deg
+    max_angle_of_attack = 10 # deg
+    max_leg = 3 # airports
+
+    def __init__(self, size, airports, profile=DEFAULT_PROFILE, seed=None):
+        self.fleet = Fleet(size, profile)
+        self.airports = np.asarray(airports, dtype=float)
+        self.rng = np.random.default_rng(seed)
+        self.origin = np.zeros(size, dtype=int)
+        self.destination = np.zeros(size, dtype=int)
+        self.cruise_altitude = np.zeros(size) # m
+        self.cruise_speed = np.zeros(size) # m/s
+
+        # Spread the initial traffic along its legs, already flying at cruise
+        index = np.arange(size)
+        self.schedule(index, self.rng.integers(0, len(self.airports) - 1, size))
+        fleet = self.fleet
+        start, end = self.airports[self.origin], self.airports[self.destination]
+        fleet.position[:] = start + self.rng.uniform(0.1, 0.6, size)*(end - start)
+        fleet.altitude[:] = self.cruise_altitude
+        fleet.horizontal_speed[:] = self.cruise_speed
+        fleet.pitch[:] = 5
+        fleet.thrust_level[:] = 0.5
+        fleet.gear_down[:] = False
+
+    #------------------------------------------------------------
+    def schedule(self, index, origin):
+        """Schedule new legs and put the aircraft on the runway of their origin airport.
+
+        Args:
+            index (numpy.ndarray): Aircraft to schedule
+            origin (numpy.ndarray): Index of the airports the aircraft depart from
+        """
+        count = len(index)
+        self.origin[index] = origin
+        self.destination[index] = np.minimum(origin + self.rng.integers(1, self.max_leg + 1, count), len(self.airports) - 1)
+        self.cruise_altitude[index] = np.round(self.rng.uniform(800, 3500, count), -2)
+        self.cruise_speed[index] = self.rng.uniform(140, 180, count)
+
+        fleet = self.fleet
+        fleet.reset(index)
+        fleet.position[index] = self.airports[origin] + 100
+        fleet.thrust_level[index] = 1
+        fleet.flap_deflection[index] = self.takeoff_flaps
+    #------------------------------------------------------------
+    def autopilot(self, Δt):
+        """Set the controls of all aircraft to follow their schedules.
+
+        Args:
+            Δt (float): Time step in s
+        """
+        fleet = self.fleet
+        distance = self.airports[self.destination] - fleet.position
+        approach = distance < self.approach_distance
+
+        # Speeds are flown relative to the air
+        airspeed = fleet.horizontal_speed - fleet.wind_horizontal
+
+        # Takeoff roll: accelerate on the runway and rotate
+        on_ground = fleet.altitude==fleet.ground
+        fleet.pitch[on_ground] = np.where(airspeed[on_ground] < self.rotation_speed, 0, self.rotation_pitch)
+
+        # In flight: hold the target altitude through the pitch and the target speed through the thrust
+        airborne = ~on_ground
+        target_altitude = np.minimum(self.cruise_altitude, self.pattern_altitude + self.descent_gradient*distance)
+        target_altitude = np.maximum(target_altitude, fleet.ground + self.terrain_clearance)
+        target_speed = np.where(approach, self.approach_speed, self.cruise_speed)
+        target_vertical_speed = np.clip(self.altitude_gain*(target_altitude - fleet.altitude), -self.max_descent_rate, self.max_climb_rate)
+        pitch = np.clip(fleet.pitch + self.pitch_gain*(target_vertical_speed - fleet.vertical_speed)*Δt, *self.pitch_limits)
+        # Stall protection: never pitch beyond the maximal angle of attack
+        pitch = np.minimum(pitch, fleet.slope + self.max_angle_of_attack)
+        thrust_level = np.clip(fleet.thrust_level + self.thrust_gain*(target_speed - airspeed)*Δt, 0, 1)
+        fleet.pitch[airborne] = pitch[airborne]
+        fleet.thrust_level[airborne] = thrust_level[airborne]
+
+        # Configuration: gear and flaps up after takeoff, gear and flaps down on approach
+        fleet.gear_down[airborne] = approach[airborne] | (fleet.altitude[airborne] < self.gear_retraction_altitude)
+        retract = airborne & ~approach & (fleet.altitude > self.flaps_retraction_altitude)
+        fleet.flap_deflection[retract] = 0
+        fleet.flap_deflection[airborne & approach] = self.approach_flaps
+    #------------------------------------------------------------
+    def step(self, Δt):
+        """Advance the traffic by one time step.
+
+        Aircraft reaching their destination depart again on a new leg, crashed aircraft are
+        replaced by a new departure from a random airport.
+
+        Args:
+            Δt (float): Time step in s
+        """
+        self.autopilot(Δt)
+        self.fleet.step(Δt)
+
+        arrived = np.flatnonzero(self.fleet.position >= self.airports[self.destination])
+        if arrived.size:
+            # Turn around at the end of the route
+            origin = np.where(self.destination[arrived] == len(self.airports) - 1, 0, self.destination[arrived])
+            self.schedule(arrived, origin)
+        crashed = np.flatnonzero(self.fleet.crashed)
+        if crashed.size:
+            self.schedule(crashed, self.rng.integers(0, len(self.airports) - 1, crashed.size))
+    #------------------------------------------------------------
+    def visible(self, position_range, altitude_range, margin=0):
+        """Indices of the aircraft within a range of positions and altitudes.
+
+        Args:
+            position_range (tuple): Minimal and maximal position in m
+            altitude_range (tuple): Minimal and maximal altitude in m
+            margin (float): Extension of the ranges in m, e.g. to account for the size of the sprites
+
+        Returns:
+            numpy.ndarray: Indices of the visible aircraft
+        """
+        fleet = self.fleet
+        inside = (
+            (fleet.position >= position_range[0] - margin) & (fleet.position <= position_range[1] + margin)
+            & (fleet.altitude >= altitude_range[0] - margin) & (fleet.altitude <= altitude_range[1] + margin)
+        )
+        return np.flatnonzero(inside)
+#=========================================================================================================
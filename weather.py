@@ -0,0 +1,123 @@
+import numpy as np
+from math import floor
+
+
+class WindField(object):
+    """
+    Seeded wind and turbulence field over position, altitude and time.
+
+    The field is generated once into a compact grid holding the horizontal and vertical wind
+    components: a mean wind increasing with altitude (power law) plus smooth random gusts. The grid
+    tiles periodically along the position and time axes and is sampled by trilinear interpolation,
+    either for a single aircraft (sample) or for a whole fleet at once (sample_batch).
+
+    Attributes:
+        mean_wind : float
+            Mean horizontal wind at the reference altitude in m/s (positive values blow along the route).
+        position_spacing : float
+            Grid spacing along the position in m.
+        altitude_spacing : float
+            Grid spacing along the altitude in m.
+        time_spacing : float
+            Grid spacing along the time in s.
+        horizontal : numpy.ndarray
+            Horizontal wind component on the grid of shape (time, altitude, position) in m/s.
+        vertical : numpy.ndarray
+            Vertical wind component on the grid of shape (time, altitude, position) in m/s.
+    """
+    reference_altitude = 1000 # m
+    boundary_layer = 300 # m
+
+    def __init__(self, seed=None, mean_wind=None, gust_intensity=3, vertical_gust_intensity=1,
+                 shape=(32, 25, 128), position_spacing=500, altitude_spacing=500, time_spacing=20):
+        rng = np.random.default_rng(seed)
+        self.mean_wind = rng.uniform(-10, 10) if mean_wind is None else mean_wind # m/s
+        self.position_spacing = position_spacing # m
+        self.altitude_spacing = altitude_spacing # m
+        self.time_spacing = time_spacing # s
+        self.shape = nt, nz, nx = shape
+
+        # Mean wind profile and damping of the gusts close to the ground
+        altitude = np.arange(nz)*altitude_spacing
+        profile = (np.maximum(altitude, 10)/self.reference_altitude)**(1/7)
+        damping = np.minimum(1, altitude/self.boundary_layer)
+
+        self.horizontal = ((self.mean_wind + gust_intensity*self._gusts(rng, shape))*profile[:,None]).astype(np.float32)
+        self.vertical = (vertical_gust_intensity*damping[:,None]*self._gusts(rng, shape)).astype(np.float32)
+
+        # Flat copies of the grid for the interpolation of single aircraft
+        self._horizontal = self.horizontal.ravel().tolist()
+        self._vertical = self.vertical.ravel().tolist()
+
+    #------------------------------------------------------------
+    @staticmethod
+    def _gusts(rng, shape, correlation=3):
+        """Smooth random noise of unit variance, periodic along time and position.
+
+        The noise is obtained by low-pass filtering white noise in Fourier space. It is generated on
+        twice the number of altitude levels so that the lowest and highest levels are not correlated.
+        """
+        nt, nz, nx = shape
+        noise = rng.standard_normal((nt, 2*nz, nx))
+        frequencies = np.meshgrid(*[np.fft.fftfreq(n) for n in noise.shape], indexing='ij')
+        spectrum = np.exp(-sum((correlation*f)**2 for f in frequencies)*np.pi**2)
+        gusts = np.real(np.fft.ifftn(np.fft.fftn(noise)*spectrum))[:,:nz]
+        return gusts/gusts.std()
+    #------------------------------------------------------------
+    def sample(self, position, altitude, time):
+        """Wind at the location of a single aircraft.
+
+        Args:
+            position (float): Position in m
+            altitude (float): Altitude in m
+            time (float): Time in s
+
+        Returns:
+            tuple: Horizontal and vertical wind components in m/s
+        """
+        nt, nz, nx = self.shape
+        x = position/self.position_spacing
+        z = min(max(altitude/self.altitude_spacing, 0), nz - 1.000001)
+        t = time/self.time_spacing
+        i, k, j = floor(x), floor(z), floor(t)
+        fx, fz, ft = x - i, z - k, t - j
+        i, j = i % nx, j % nt
+        i1, j1 = (i + 1) % nx, (j + 1) % nt
+
+        # Flat indices of the surrounding grid points, interpolated along the position first
+        a, b, c, d = (j*nz + k)*nx, (j*nz + k + 1)*nx, (j1*nz + k)*nx, (j1*nz + k + 1)*nx
+        gx = 1 - fx
+        h, v = self._horizontal, self._vertical
+        horizontal = ((1-ft)*((1-fz)*(gx*h[a+i] + fx*h[a+i1]) + fz*(gx*h[b+i] + fx*h[b+i1]))
+                      + ft*((1-fz)*(gx*h[c+i] + fx*h[c+i1]) + fz*(gx*h[d+i] + fx*h[d+i1])))
+        vertical = ((1-ft)*((1-fz)*(gx*v[a+i] + fx*v[a+i1]) + fz*(gx*v[b+i] + fx*v[b+i1]))
+                    + ft*((1-fz)*(gx*v[c+i] + fx*v[c+i1]) + fz*(gx*v[d+i] + fx*v[d+i1])))
+        return horizontal, vertical
+    #------------------------------------------------------------
+    def sample_batch(self, position, altitude, time):
+        """Wind at the locations of many aircraft.
+
+        Args:
+            position (numpy.ndarray): Positions in m
+            altitude (numpy.ndarray): Altitudes in m
+            time (numpy.ndarray or float): Times in s
+
+        Returns:
+            tuple: Horizontal and vertical wind components in m/s
+        """
+        nt, nz, nx = self.shape
+        x = np.asarray(position)/self.position_spacing
+        z = np.clip(np.asarray(altitude)/self.altitude_spacing, 0, nz - 1.000001)
+        t = np.broadcast_to(np.asarray(time)/self.time_spacing, x.shape)
+        i, k, j = np.floor(x), np.floor(z), np.floor(t)
+        fx, fz, ft = x - i, z - k, t - j
+        i, k, j = i.astype(int) % nx, k.astype(int), j.astype(int) % nt
+        i1, j1 = (i + 1) % nx, (j + 1) % nt
+
+        components = []
+        for grid in (self.horizontal, self.vertical):
+            at_t0 = (1-fz)*((1-fx)*grid[j,k,i] + fx*grid[j,k,i1]) + fz*((1-fx)*grid[j,k+1,i] + fx*grid[j,k+1,i1])
+            at_t1 = (1-fz)*((1-fx)*grid[j1,k,i] + fx*grid[j1,k,i1]) + fz*((1-fx)*grid[j1,k+1,i] + fx*grid[j1,k+1,i1])
+            components.append((1-ft)*at_t0 + ft*at_t1)
+        return tuple(components)
+#=========================================================================================================
@@ -0,0 +1,158 @@
+import numpy as np
+
+#=========================================================================================================
+# Configure the ground, airports and runways
+GROUND_HEIGHT = 2 # m
+AIRPORTS = [0,8000,40000,60000,80000,100000,120000] # m
+RUNWAY_HEIGHT = 5 # m
+RUNWAY_LENGTH = 2200 # m
+MARKINGS_LENGTH = 50 # m
+CITY_EXTENSION = 25 # m
+
+#=========================================================================================================
+def runway_at(position, airports=AIRPORTS):
+    """Number of the airport whose runway lies at the given positions.
+
+    Positions are checked against all airports at once, so that whole fleets can be checked together.
+
+    Arguments:
+    position : float or numpy.ndarray
+        Positions in meters
+    airports : list
+        Positions of the airports in meters
+
+    Returns:
+    numpy.ndarray
+        Number of the airport (starting at 1) for each position or 0 if outside of a runway
+    """
+    position = np.abs(position)
+    airports = np.asarray(airports)
+    # Index of the last airport starting before each position
+    n = np.searchsorted(airports, position, side='right') - 1
+    on_runway = (n>=0) & (position <= airports[np.maximum(n,0)] + RUNWAY_LENGTH)
+    return np.where(on_runway, n+1, 0)
+#=========================================================================================================
+
+
+class Terrain(object):
+    """
+    Ground elevation along the route, stored as a heightfield sampled at a regular spacing.
+
+    The elevation and slope at any position are interpolated linearly between the two surrounding
+    samples, found by index arithmetic in constant time. Beyond the ends of the heightfield, the
+    ground stays at the elevation of the first and last samples.
+
+    Attributes:
+        heights : numpy.ndarray
+            Elevations of the samples in m.
+        spacing : float
+            Distance between the samples in m.
+        start : float
+            Position of the first sample in m.
+    """
+    def __init__(self, heights, spacing, start=0):
+        self.heights = np.asarray(heights, dtype=float) # m
+        if self.heights.ndim != 1 or self.heights.size < 2:
+            raise ValueError('A heightfield needs at least two samples')
+        self.spacing = spacing # m
+        self.start = start # m
+        self.end = start + spacing*(self.heights.size - 1) # m
+
+        # Slopes between the samples, and plain lists of both for the lookups of single aircraft
+        self.slopes = np.diff(self.heights)/spacing
+        self._heights = self.heights.tolist()
+        self._slopes = self.slopes.tolist()
+
+    #------------------------------------------------------------
+    @classmethod
+    def generate(cls, seed=None, airports=AIRPORTS, max_elevation=400, spacing=25, correlation=3000,
+                 clearance=2000, ramp=6000, margin=10000):
+        """Generate random hills between the airports.
+
+        The ground is flat (elevation 0) within the clearance distance of every runway and rises
+        smoothly to the full height of the hills over the ramp distance.
+
+        Args:
+            seed (int, optional): Seed of the hills
+            airports (list): Positions of the airports in m
+            max_elevation (float): Elevation of the highest hills in m
+            spacing (float): Distance between the samples in m
+            correlation (float): Typical width of the hills in m
+            clearance (float): Flat distance around the runways in m
+            ramp (float): Distance over which the hills rise beyond the clearance in m
+            margin (float): Length of the terrain before the first and after the last airport in m
+
+        Returns:
+            Terrain: Generated terrain
+        """
+        rng = np.random.default_rng(seed)
+        start = airports[0] - margin
+        count = int((airports[-1] + RUNWAY_LENGTH + margin - start)/spacing) + 1
+        position = start + spacing*np.arange(count)
+
+        # Smooth random hills from low-pass filtered white noise
+        frequencies = np.fft.rfftfreq(count, spacing)
+        hills = np.fft.irfft(np.fft.rfft(rng.standard_normal(count))*np.exp(-(np.pi*correlation*frequencies)**2), count)
+        hills = (hills - hills.min())/(hills.max() - hills.min())
+
+        # Flatten the ground around the runways
+        distance = np.min([np.maximum.reduce([airport - position, position - airport - RUNWAY_LENGTH, np.zeros(count)])
+                           for airport in airports], axis=0)
+        envelope = np.clip((distance - clearance)/ramp, 0, 1)
+        return cls(max_elevation*hills*envelope**2*(3 - 2*envelope), spacing, start)
+    #------------------------------------------------------------
+    @classmethod
+    def load(cls, path):
+        """Load a heightfield saved by Terrain.save.
+
+        Args:
+            path (str): Path of the .npz file
+
+        Returns:
+            Terrain: Loaded terrain
+        """
+        with np.load(path) as data:
+            return cls(data['heights'], float(data['spacing']), float(data['start']))
+    #------------------------------------------------------------
+    def save(self, path):
+        """Save the heightfield into a .npz file.
+
+        Args:
+            path (str): Path of the file
+        """
+        np.savez_compressed(path, heights=self.heights, spacing=self.spacing, start=self.start)
+    #------------------------------------------------------------
+    def sample(self, position):
+        """Ground elevation and slope at a single position.
+
+        Args:
+            position (float): Position in m
+
+        Returns:
+            tuple: Elevation in m and slope (elevation gained per meter)
+        """
+        x = (position - self.start)/self.spacing
+        if x <= 0:
+            return self._heights[0], 0
+        i = int(x)
+        if i >= len(self._slopes):
+            return self._heights[-1], 0
+        slope = self._slopes[i]
+        return self._heights[i] + (position - self.start - i*self.spacing)*slope, slope
+    #------------------------------------------------------------
+    def sample_batch(self, position):
+        """Ground elevations and slopes at many positions.
+
+        Args:
+            position (numpy.ndarray): Positions in m
+
+        Returns:
+            tuple: Elevations in m and slopes
+        """
+        x = (np.asarray(position) - self.start)/self.spacing
+        i = np.clip(x.astype(int), 0, self.slopes.size - 1)
+        inside = (x > 0) & (x < self.slopes.size)
+        fraction = np.clip(x - i, 0, 1)
+        slope = self.slopes[i]
+        return self.heights[i] + fraction*self.spacing*slope, np.where(inside, slope, 0)
+#=========================================================================================================